@@ -8,31 +8,270 @@ from flask import Flask, request, jsonify, send_file
 from flask_cors import CORS
 import numpy as np
 import cv2
-import io
-import base64
-from PIL import Image
+import hashlib
+import multiprocessing as mp
+import threading
+from collections import OrderedDict
+try:
+    import pybase64 as base64  # SIMD-accelerated drop-in for the stdlib module
+except ImportError:
+    import base64
 import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from typing import Dict, List, Tuple, Optional
 
-from preprocessing import preprocess_image, load_image
-from pso_segmentation import pso_threshold
-from metrics import compute_all_metrics
+from preprocessing import preprocess_image, preprocess_batch, load_image, binarize_mask
+from pso_segmentation import pso_threshold, apply_threshold, warmup
+from metrics import threshold_metrics
 from results_exporter import generate_summary_statistics
 import config
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for React frontend
 
+# Compile the PSO kernels before serving the first request
+warmup()
 
-def image_to_base64(img: np.ndarray) -> str:
-    """Convert numpy array to base64 string."""
-    pil_img = Image.fromarray(img)
-    buff = io.BytesIO()
-    pil_img.save(buff, format="PNG")
-    img_str = base64.b64encode(buff.getvalue()).decode()
+# Base64/PNG decoding releases the GIL, so threads are enough; PSO is CPU-bound
+decode_pool = ThreadPoolExecutor(max_workers=os.cpu_count())
+# Created on first use by _get_pso_pool
+_pso_pool: Optional[ProcessPoolExecutor] = None
+_pso_pool_lock = threading.Lock()
+# One thread per image returned by /api/process (processed, prediction, mask)
+encode_pool = ThreadPoolExecutor(max_workers=3)
+
+# LRU cache of preprocessed images keyed by a digest of the decoded image file
+_image_cache: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+_image_cache_lock = threading.Lock()
+
+
+def image_to_base64(img: np.ndarray, bilevel: bool = False) -> str:
+    """
+    Convert numpy array to base64 string.
+    
+    With bilevel=True the image is written as a 1-bit PNG in which any
+    non-zero pixel is white, so binary masks can be passed as {0, 1}.
+    """
+    # Level 1 compression is several times faster than the default at a small size cost
+    params = [cv2.IMWRITE_PNG_COMPRESSION, 1]
+    if bilevel:
+        params += [cv2.IMWRITE_PNG_BILEVEL, 1]
+    ok, buffer = cv2.imencode('.png', img, params)
+    if not ok:
+        raise ValueError("Failed to encode image as PNG")
+    img_str = base64.b64encode(buffer).decode()
     return f"data:image/png;base64,{img_str}"
 
 
+def _decode_base64(data: str) -> bytes:
+    """Decode a base64 (optionally data-URL prefixed) string to raw file bytes."""
+    # Strip an optional "data:image/...;base64," prefix without splitting the whole payload
+    return base64.b64decode(data.rpartition(',')[2])
+
+
+def _decode_base64_image(data: str) -> Optional[np.ndarray]:
+    """Decode a base64 (optionally data-URL prefixed) string to a grayscale image."""
+    # frombuffer is a zero-copy view over the decoded bytes
+    buffer = np.frombuffer(_decode_base64(data), np.uint8)
+    return cv2.imdecode(buffer, cv2.IMREAD_GRAYSCALE)
+
+
+def _lookup_image(data: str) -> Tuple[bytes, Optional[np.ndarray], Optional[np.ndarray]]:
+    """
+    Decode a base64 image and look it up in the preprocessed-image cache.
+    
+    Returns
+    -------
+    tuple
+        (key, img_processed, image_array); on a cache hit image_array is
+        None, on a miss img_processed is None and image_array is the decoded
+        image (None if the payload could not be decoded)
+    """
+    # Hash the decoded bytes rather than data.encode(), which would copy the
+    # whole payload just to compute the key
+    image_bytes = _decode_base64(data)
+    key = hashlib.blake2b(image_bytes, digest_size=16).digest()
+    
+    with _image_cache_lock:
+        img_processed = _image_cache.get(key)
+        if img_processed is not None:
+            _image_cache.move_to_end(key)
+            return key, img_processed, None
+    
+    image_array = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_GRAYSCALE)
+    return key, None, image_array
+
+
+def _cache_image(key: bytes, img_processed: np.ndarray) -> np.ndarray:
+    """Store a preprocessed image in the LRU cache, marking it read-only."""
+    img_processed.flags.writeable = False
+    
+    with _image_cache_lock:
+        _image_cache[key] = img_processed
+        while len(_image_cache) > config.IMAGE_CACHE_SIZE:
+            _image_cache.popitem(last=False)
+    
+    return img_processed
+
+
+def _decode_and_preprocess(data: str) -> Optional[np.ndarray]:
+    """
+    Decode and preprocess a base64 image, reusing the result for repeated images.
+    
+    Base64 decoding always runs (it is cheap); imdecode and preprocessing
+    are skipped on a cache hit. Cached arrays are shared between requests
+    and therefore read-only.
+    
+    Parameters
+    ----------
+    data : str
+        Base64 encoded image, optionally data-URL prefixed
+        
+    Returns
+    -------
+    np.ndarray or None
+        Preprocessed image, or None if the payload could not be decoded
+    """
+    key, img_processed, image_array = _lookup_image(data)
+    if img_processed is not None:
+        return img_processed
+    if image_array is None:
+        return None
+    
+    return _cache_image(key, preprocess_image(image_array))
+
+
+def _metrics_to_dict(metrics: Tuple[float, float, float, float]) -> Dict[str, float]:
+    """Convert a (dice, iou, precision, recall) tuple to a JSON-friendly dict."""
+    return {
+        'dice': float(metrics[0]),
+        'iou': float(metrics[1]),
+        'precision': float(metrics[2]),
+        'recall': float(metrics[3])
+    }
+
+
+def _decode_item(
+    item: Dict
+) -> Optional[Tuple[bytes, Optional[np.ndarray], Optional[np.ndarray], Optional[np.ndarray]]]:
+    """
+    Decode one batch item without preprocessing it.
+    
+    Returns
+    -------
+    tuple or None
+        (key, img_processed, image_array, mask_array) as returned by
+        _lookup_image plus the decoded mask (None if no usable mask was
+        sent), or None if the image itself could not be decoded
+    """
+    if 'image' not in item:
+        return None
+    
+    key, img_processed, image_array = _lookup_image(item['image'])
+    if img_processed is None and image_array is None:
+        return None
+    
+    mask_array = None
+    if 'mask' in item and item['mask']:
+        mask_array = _decode_base64_image(item['mask'])
+    
+    return key, img_processed, image_array, mask_array
+
+
+def _decode_batch(items: List[Dict]) -> List[Tuple[np.ndarray, Optional[np.ndarray]]]:
+    """
+    Decode and preprocess batch items.
+    
+    Decoding runs on the thread pool; cache misses are then preprocessed
+    together with preprocess_batch (on the GPU when available).
+    
+    Returns
+    -------
+    list of tuple
+        (img_processed, mask_binary) for each decodable item, in order;
+        mask_binary is None if no usable mask was sent
+    """
+    # Undecodable items are dropped, matching the sequential behaviour
+    decoded = [d for d in decode_pool.map(_decode_item, items) if d is not None]
+    
+    misses = [i for i, d in enumerate(decoded) if d[1] is None]
+    processed = preprocess_batch([decoded[i][2] for i in misses], executor=decode_pool)
+    processed_images = [d[1] for d in decoded]
+    for i, img_processed in zip(misses, processed):
+        processed_images[i] = _cache_image(decoded[i][0], img_processed)
+    
+    return [
+        (img_processed, binarize_mask(mask_array, img_processed.shape) if mask_array is not None else None)
+        for img_processed, (_, _, _, mask_array) in zip(processed_images, decoded)
+    ]
+
+
+def _get_pso_pool() -> ProcessPoolExecutor:
+    """
+    Process pool for the swarm, created on the first "pso" batch.
+    
+    Workers are spawned rather than forked: by then this process has live
+    request and thread-pool threads, which a fork would copy in an
+    arbitrary state. Each worker compiles the kernels once via warmup.
+    """
+    global _pso_pool
+    
+    with _pso_pool_lock:
+        if _pso_pool is None:
+            _pso_pool = ProcessPoolExecutor(
+                max_workers=config.N_WORKERS or max(1, (os.cpu_count() or 1) - 1),
+                mp_context=mp.get_context('spawn'),
+                initializer=warmup
+            )
+        return _pso_pool
+
+
+def _tumour_threshold(img_processed: np.ndarray, mask_binary: np.ndarray) -> Optional[float]:
+    """PSO threshold for a slice, or None for healthy slices (empty mask)."""
+    if mask_binary.sum() > 0:
+        return pso_threshold(img_processed, mask_binary)
+    return None
+
+
+def _score(
+    img_processed: np.ndarray,
+    mask_binary: np.ndarray,
+    threshold: Optional[float]
+) -> Tuple[float, float, float, float]:
+    """
+    Evaluate thresholding a preprocessed image against its mask.
+    
+    Thresholds and counts in one pass without building the prediction; a
+    None threshold scores an empty prediction.
+    """
+    return threshold_metrics(img_processed, mask_binary, threshold)
+
+
+def _segment(
+    img_processed: np.ndarray,
+    mask_binary: np.ndarray
+) -> Tuple[Tuple[float, float, float, float], Optional[float], np.ndarray]:
+    """
+    Segment a preprocessed image against its mask.
+    
+    Returns
+    -------
+    tuple
+        (metrics, threshold, pred); threshold is None for healthy slices
+    """
+    threshold = _tumour_threshold(img_processed, mask_binary)
+    metrics = _score(img_processed, mask_binary, threshold)
+    
+    # The prediction is only built here, where it is encoded into the response
+    if threshold is not None:
+        pred = apply_threshold(img_processed, threshold)
+    else:
+        # Healthy slice - nothing to threshold
+        pred = np.zeros_like(mask_binary, dtype=np.uint8)
+    
+    return metrics, threshold, pred
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
@@ -59,74 +298,39 @@ def process_image():
         if 'image' not in data:
             return jsonify({'error': 'Image is required'}), 400
         
-        # Decode image
-        image_data = data['image'].split(',')[1] if ',' in data['image'] else data['image']
-        image_bytes = base64.b64decode(image_data)
-        image_array = np.frombuffer(image_bytes, np.uint8)
-        image_array = cv2.imdecode(image_array, cv2.IMREAD_GRAYSCALE)
+        # Decode and preprocess image
+        img_processed = _decode_and_preprocess(data['image'])
         
-        if image_array is None:
+        if img_processed is None:
             return jsonify({'error': 'Failed to decode image'}), 400
         
-        # Preprocess
-        img_processed = preprocess_image(image_array)
-        
-        result = {
-            'processed_image': image_to_base64((img_processed * 255).astype(np.uint8)),
-            'has_mask': False
-        }
+        result = {'has_mask': False}
+        # name -> (array, bilevel)
+        images = {'processed_image': (img_processed, False)}
         
         # Process mask if provided
         if 'mask' in data and data['mask']:
-            mask_data = data['mask'].split(',')[1] if ',' in data['mask'] else data['mask']
-            mask_bytes = base64.b64decode(mask_data)
-            mask_array = np.frombuffer(mask_bytes, np.uint8)
-            mask_array = cv2.imdecode(mask_array, cv2.IMREAD_GRAYSCALE)
+            mask_array = _decode_base64_image(data['mask'])
             
             if mask_array is not None:
-                # Resize mask
-                mask_resized = cv2.resize(
-                    mask_array,
-                    (image_array.shape[1], image_array.shape[0]),
-                    interpolation=cv2.INTER_NEAREST
-                )
-                mask_binary = (mask_resized > 0).astype(np.uint8)
+                mask_binary = binarize_mask(mask_array, img_processed.shape)
+                metrics, threshold, pred = _segment(img_processed, mask_binary)
                 
-                # Process with PSO
-                if mask_binary.sum() > 0:
-                    threshold = pso_threshold(img_processed, mask_binary)
-                    pred = (img_processed > threshold).astype(np.uint8)
-                    metrics = compute_all_metrics(mask_binary, pred)
-                    
-                    result.update({
-                        'has_mask': True,
-                        'metrics': {
-                            'dice': float(metrics[0]),
-                            'iou': float(metrics[1]),
-                            'precision': float(metrics[2]),
-                            'recall': float(metrics[3])
-                        },
-                        'threshold': float(threshold),
-                        'prediction': image_to_base64(pred * 255),
-                        'mask': image_to_base64(mask_binary * 255)
-                    })
-                else:
+                result.update({
+                    'has_mask': True,
+                    'metrics': _metrics_to_dict(metrics),
+                    'threshold': float(threshold) if threshold is not None else None
+                })
+                if threshold is None:
                     # Healthy slice
-                    pred = np.zeros_like(mask_binary, dtype=np.uint8)
-                    metrics = compute_all_metrics(mask_binary, pred)
-                    result.update({
-                        'has_mask': True,
-                        'metrics': {
-                            'dice': float(metrics[0]),
-                            'iou': float(metrics[1]),
-                            'precision': float(metrics[2]),
-                            'recall': float(metrics[3])
-                        },
-                        'threshold': None,
-                        'prediction': image_to_base64(pred),
-                        'mask': image_to_base64(mask_binary * 255),
-                        'is_healthy': True
-                    })
+                    result['is_healthy'] = True
+                
+                images['prediction'] = (pred, True)
+                images['mask'] = (mask_binary, True)
+        
+        # PNG encoding releases the GIL, so the images are encoded concurrently
+        arrays, bilevel = zip(*images.values())
+        result.update(zip(images, encode_pool.map(image_to_base64, arrays, bilevel)))
         
         return jsonify(result)
         
@@ -139,6 +343,11 @@ def process_batch():
     """
     Process multiple images in batch.
     
+    Decoding runs on a thread pool, preprocessing is batched (on the GPU
+    when available), PSO runs on a process pool (the default exhaustive
+    scan runs inline) and scoring back on the thread pool; results are
+    returned in request order.
+    
     Expected JSON:
     {
         "images": [
@@ -158,69 +367,55 @@ def process_batch():
         healthy_metrics = []
         tumour_thresholds = []
         
-        for item in data['images']:
-            if 'image' not in item:
-                continue
-            
-            # Decode image
-            image_data = item['image'].split(',')[1] if ',' in item['image'] else item['image']
-            image_bytes = base64.b64decode(image_data)
-            image_array = np.frombuffer(image_bytes, np.uint8)
-            image_array = cv2.imdecode(image_array, cv2.IMREAD_GRAYSCALE)
-            
-            if image_array is None:
-                continue
-            
-            img_processed = preprocess_image(image_array)
-            
+        decoded = _decode_batch(data['images'])
+        scored = [(img_processed, mask_binary) for img_processed, mask_binary in decoded if mask_binary is not None]
+        
+        if config.THRESHOLD_METHOD == "pso":
+            # The swarm is CPU-bound, so it runs on the process pool. Workers
+            # get pso_threshold itself, so they never import this module; the
+            # method is passed explicitly since spawned workers reload config.
+            # Healthy slices (empty mask) are settled here
+            pso_pool = _get_pso_pool()
+            futures = [
+                pso_pool.submit(pso_threshold, img_processed, mask_binary, method="pso") if mask_binary.any() else None
+                for img_processed, mask_binary in scored
+            ]
+            thresholds = (future.result() if future is not None else None for future in futures)
+        else:
+            # The exhaustive scan is cheaper than pickling a slice to another
+            # process, so it runs inline
+            thresholds = (_tumour_threshold(img_processed, mask_binary) for img_processed, mask_binary in scored)
+        
+        # The fused scoring kernel releases the GIL, so scoring runs on the
+        # thread pool; no prediction mask is built for batch results
+        scores = iter([
+            (threshold, decode_pool.submit(_score, img_processed, mask_binary, threshold))
+            for (img_processed, mask_binary), threshold in zip(scored, thresholds)
+        ])
+        
+        for _, mask_binary in decoded:
             result_item = {'processed': True}
             
-            if 'mask' in item and item['mask']:
-                mask_data = item['mask'].split(',')[1] if ',' in item['mask'] else item['mask']
-                mask_bytes = base64.b64decode(mask_data)
-                mask_array = np.frombuffer(mask_bytes, np.uint8)
-                mask_array = cv2.imdecode(mask_array, cv2.IMREAD_GRAYSCALE)
+            if mask_binary is not None:
+                threshold, score_future = next(scores)
+                metrics = score_future.result()
                 
-                if mask_array is not None:
-                    mask_resized = cv2.resize(
-                        mask_array,
-                        (image_array.shape[1], image_array.shape[0]),
-                        interpolation=cv2.INTER_NEAREST
-                    )
-                    mask_binary = (mask_resized > 0).astype(np.uint8)
+                if threshold is not None:
+                    tumour_metrics.append(metrics)
+                    tumour_thresholds.append(threshold)
                     
-                    if mask_binary.sum() > 0:
-                        threshold = pso_threshold(img_processed, mask_binary)
-                        pred = (img_processed > threshold).astype(np.uint8)
-                        metrics = compute_all_metrics(mask_binary, pred)
-                        
-                        tumour_metrics.append(metrics)
-                        tumour_thresholds.append(threshold)
-                        
-                        result_item.update({
-                            'metrics': {
-                                'dice': float(metrics[0]),
-                                'iou': float(metrics[1]),
-                                'precision': float(metrics[2]),
-                                'recall': float(metrics[3])
-                            },
-                            'threshold': float(threshold),
-                            'is_tumour': True
-                        })
-                    else:
-                        pred = np.zeros_like(mask_binary, dtype=np.uint8)
-                        metrics = compute_all_metrics(mask_binary, pred)
-                        healthy_metrics.append(metrics)
-                        
-                        result_item.update({
-                            'metrics': {
-                                'dice': float(metrics[0]),
-                                'iou': float(metrics[1]),
-                                'precision': float(metrics[2]),
-                                'recall': float(metrics[3])
-                            },
-                            'is_healthy': True
-                        })
+                    result_item.update({
+                        'metrics': _metrics_to_dict(metrics),
+                        'threshold': float(threshold),
+                        'is_tumour': True
+                    })
+                else:
+                    healthy_metrics.append(metrics)
+                    
+                    result_item.update({
+                        'metrics': _metrics_to_dict(metrics),
+                        'is_healthy': True
+                    })
             
             results.append(result_item)
         
@@ -243,6 +438,7 @@ def process_batch():
 def get_config():
     """Get current configuration."""
     return jsonify({
+        'threshold_method': config.THRESHOLD_METHOD,
         'pso_particles': config.PSO_N_PARTICLES,
         'pso_iterations': config.PSO_ITERATIONS,
         'pso_options': config.PSO_OPTIONS,
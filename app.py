@@ -14,12 +14,16 @@ import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
 
-from preprocessing import load_image, preprocess_image
-from pso_segmentation import pso_threshold
+from preprocessing import load_image, preprocess_image, binarize_mask
+from pso_segmentation import pso_threshold, apply_threshold, warmup
 from metrics import compute_all_metrics
+from visualization import overlay_mask
 import config
 
 
+# Compile the PSO kernels up front instead of on the first button press
+warmup()
+
 # Page configuration
 st.set_page_config(
     page_title="PSO Brain Tumor Segmentation",
@@ -65,24 +69,51 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-def process_image_upload(img_array: np.ndarray, mask_array: np.ndarray = None):
-    """Process uploaded image and return results."""
+@st.cache_data(ttl=3600, show_spinner=False)
+def decode_upload(file_bytes: bytes) -> np.ndarray:
+    """Decode uploaded file bytes to a grayscale image (None if undecodable)."""
+    return cv2.imdecode(np.frombuffer(file_bytes, np.uint8), cv2.IMREAD_GRAYSCALE)
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _preprocess_cached(img_bytes: bytes) -> np.ndarray:
+    """Preprocess an uploaded image, cached on its raw bytes."""
+    return preprocess_image(decode_upload(img_bytes))
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _pso_cached(img_bytes: bytes, mask_bytes: bytes, n_particles: int, iterations: int):
+    """Run PSO for an image/mask pair, cached on the inputs and PSO settings."""
+    img_processed = _preprocess_cached(img_bytes)
+    mask_binary = binarize_mask(decode_upload(mask_bytes), img_processed.shape)
+    return pso_threshold(
+        img_processed, mask_binary, n_particles=n_particles, iters=iterations, method="pso"
+    )
+
+
+def process_image_upload(
+    img_bytes: bytes,
+    mask_bytes: bytes = None,
+    n_particles: int = config.PSO_N_PARTICLES,
+    iterations: int = config.PSO_ITERATIONS
+):
+    """
+    Process uploaded image and return results.
+    
+    Preprocessing and PSO are cached on the uploaded bytes, so reruns only
+    recompute the steps whose inputs changed.
+    """
     # Preprocess image
-    img_processed = preprocess_image(img_array)
+    img_processed = _preprocess_cached(img_bytes)
     
-    if mask_array is not None:
+    if mask_bytes is not None:
         # Resize mask to match image
-        mask_resized = cv2.resize(
-            mask_array, 
-            (img_array.shape[1], img_array.shape[0]),
-            interpolation=cv2.INTER_NEAREST
-        )
-        mask_binary = (mask_resized > 0).astype(np.uint8)
+        mask_binary = binarize_mask(decode_upload(mask_bytes), img_processed.shape)
         
         # Process with PSO
         if mask_binary.sum() > 0:
-            threshold = pso_threshold(img_processed, mask_binary)
-            pred = (img_processed > threshold).astype(np.uint8)
+            threshold = _pso_cached(img_bytes, mask_bytes, n_particles, iterations)
+            pred = apply_threshold(img_processed, threshold)
             metrics = compute_all_metrics(mask_binary, pred)
             return metrics, threshold, img_processed, mask_binary, pred
         else:
@@ -120,40 +151,37 @@ def create_metrics_gauge(value: float, title: str, color: str):
     return fig
 
 
+def to_rgb(img: np.ndarray) -> np.ndarray:
+    """Colormap a uint8 grayscale image to uint8 RGB for display."""
+    return cv2.cvtColor(cv2.applyColorMap(img, cv2.COLORMAP_BONE), cv2.COLOR_BGR2RGB)
+
+
 def create_comparison_plot(img: np.ndarray, mask: np.ndarray, pred: np.ndarray):
-    """Create side-by-side comparison plot."""
+    """
+    Create side-by-side comparison plot.
+    
+    Each panel is a single pre-colored uint8 RGB go.Image, which keeps the
+    figure JSON small and renders on canvas in the browser.
+    """
     fig = make_subplots(
         rows=1, cols=3,
-        subplot_titles=('Input Image', 'Ground Truth', 'PSO Prediction'),
+        subplot_titles=('Input', 'Ground Truth', 'PSO Prediction'),
         horizontal_spacing=0.05
     )
     
+    rgb = to_rgb(img)
+    
     # Input image
-    fig.add_trace(
-        go.Image(z=img, colorscale='gray'),
-        row=1, col=1
-    )
+    fig.add_trace(go.Image(z=rgb), row=1, col=1)
     
     # Ground truth overlay
-    fig.add_trace(
-        go.Image(z=img, colorscale='gray'),
-        row=1, col=2
-    )
-    fig.add_trace(
-        go.Image(z=mask, colorscale='Reds', opacity=0.5),
-        row=1, col=2
-    )
+    fig.add_trace(go.Image(z=overlay_mask(rgb, mask, (255, 0, 0))), row=1, col=2)
     
     # Prediction overlay
-    fig.add_trace(
-        go.Image(z=img, colorscale='gray'),
-        row=1, col=3
-    )
-    fig.add_trace(
-        go.Image(z=pred, colorscale='Blues', opacity=0.5),
-        row=1, col=3
-    )
+    fig.add_trace(go.Image(z=overlay_mask(rgb, pred, (0, 0, 255))), row=1, col=3)
     
+    fig.update_xaxes(visible=False)
+    fig.update_yaxes(visible=False)
     fig.update_layout(height=400, showlegend=False)
     return fig
 
@@ -214,9 +242,8 @@ def main():
             )
             
             if uploaded_image:
-                img_bytes = uploaded_image.read()
-                img_array = np.frombuffer(img_bytes, np.uint8)
-                img_array = cv2.imdecode(img_array, cv2.IMREAD_GRAYSCALE)
+                img_bytes = uploaded_image.getvalue()
+                img_array = decode_upload(img_bytes)
                 if img_array is not None:
                     st.image(img_array, caption="Uploaded Image", use_container_width=True)
                 else:
@@ -231,9 +258,8 @@ def main():
             )
             
             if uploaded_mask:
-                mask_bytes = uploaded_mask.read()
-                mask_array = np.frombuffer(mask_bytes, np.uint8)
-                mask_array = cv2.imdecode(mask_array, cv2.IMREAD_GRAYSCALE)
+                mask_bytes = uploaded_mask.getvalue()
+                mask_array = decode_upload(mask_bytes)
                 if mask_array is not None:
                     st.image(mask_array, caption="Ground Truth Mask", use_container_width=True)
                 else:
@@ -256,7 +282,10 @@ def main():
                     
                     # Process image
                     metrics, threshold, img_proc, mask_bin, pred = process_image_upload(
-                        img_array, mask_array if uploaded_mask else None
+                        img_bytes,
+                        mask_bytes if uploaded_mask and mask_array is not None else None,
+                        n_particles=pso_particles,
+                        iterations=pso_iterations
                     )
                     
                     progress_bar.progress(100)
@@ -313,40 +342,7 @@ def main():
                     # Comparison visualization
                     st.subheader("Visualization")
                     if mask_bin is not None and pred is not None:
-                        # Create overlay visualization
-                        fig_comparison = make_subplots(
-                            rows=1, cols=3,
-                            subplot_titles=('Input', 'Ground Truth', 'PSO Prediction'),
-                            horizontal_spacing=0.05
-                        )
-                        
-                        # Input
-                        fig_comparison.add_trace(
-                            go.Heatmap(z=img_proc, colorscale='gray', showscale=False),
-                            row=1, col=1
-                        )
-                        
-                        # Ground truth
-                        fig_comparison.add_trace(
-                            go.Heatmap(z=img_proc, colorscale='gray', showscale=False),
-                            row=1, col=2
-                        )
-                        fig_comparison.add_trace(
-                            go.Heatmap(z=mask_bin, colorscale='Reds', opacity=0.6, showscale=False),
-                            row=1, col=2
-                        )
-                        
-                        # Prediction
-                        fig_comparison.add_trace(
-                            go.Heatmap(z=img_proc, colorscale='gray', showscale=False),
-                            row=1, col=3
-                        )
-                        fig_comparison.add_trace(
-                            go.Heatmap(z=pred, colorscale='Blues', opacity=0.6, showscale=False),
-                            row=1, col=3
-                        )
-                        
-                        fig_comparison.update_layout(height=400, showlegend=False)
+                        fig_comparison = create_comparison_plot(img_proc, mask_bin, pred)
                         st.plotly_chart(fig_comparison, use_container_width=True)
                 else:
                     st.info("ℹ️ Image preprocessed. Upload a mask to see segmentation results.")
@@ -382,8 +378,8 @@ def main():
         ### 🔬 Technical Details
         
         **Algorithm:**
-        - Global-best PSO with 30 particles
-        - 40 iterations per optimization
+        - Global-best PSO with 16 particles
+        - Up to 20 iterations, stopping early once converged
         - Adaptive threshold selection
         - Otsu fallback for edge cases
         
@@ -7,15 +7,17 @@ Improved version with parallel processing, logging, and result export.
 import os
 import random
 import argparse
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 import numpy as np
 from tqdm import tqdm
-from typing import List, Tuple, Optional
+from typing import Iterator, List, Tuple, Optional
 
 import config
 from preprocessing import load_image, load_mask
-from pso_segmentation import pso_threshold
+from pso_segmentation import pso_threshold, apply_threshold
 from metrics import compute_all_metrics
-from utils import find_image_files, get_mask_path
+from utils import find_image_files, find_mask_path, get_mask_path
 from visualization import (
     save_triplet_comparison,
     plot_dice_histogram,
@@ -27,10 +29,44 @@ from parallel_processing import process_images_parallel
 from results_exporter import export_results_to_json, export_results_to_csv, generate_summary_statistics
 
 
+def load_pair(image_path: str, mask_path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Load and preprocess an image and its mask (the I/O-bound part of a slice)."""
+    img = load_image(image_path)
+    mask = load_mask(mask_path, img.shape)
+    return img, mask
+
+
+def segment_image(
+    img: np.ndarray,
+    mask: np.ndarray
+) -> Tuple[Tuple[float, float, float, float], Optional[float], bool, np.ndarray]:
+    """
+    Threshold a loaded slice and evaluate it (the CPU-bound part of a slice).
+    
+    Returns
+    -------
+    tuple
+        (metrics, threshold, is_tumor, pred)
+    """
+    is_tumor = bool(mask.any())
+    
+    if not is_tumor:
+        # Healthy slice - no tumor
+        pred = np.zeros_like(mask, dtype=np.uint8)
+        threshold = None
+    else:
+        # Tumor slice - use PSO to find optimal threshold
+        threshold = pso_threshold(img, mask)
+        pred = apply_threshold(img, threshold)
+    
+    metrics = compute_all_metrics(mask, pred)
+    return metrics, threshold, is_tumor, pred
+
+
 def process_image_sequential(
     image_path: str,
     mask_path: str
-) -> Tuple[Tuple[float, float, float, float], Optional[float], np.ndarray, np.ndarray, np.ndarray]:
+) -> Tuple[Tuple[float, float, float, float], Optional[float], bool, np.ndarray, np.ndarray, np.ndarray]:
     """
     Process a single image sequentially.
     
@@ -44,22 +80,33 @@ def process_image_sequential(
     Returns
     -------
     tuple
-        (metrics, threshold, img, mask, pred)
+        (metrics, threshold, is_tumor, img, mask, pred)
     """
-    img = load_image(image_path)
-    mask = load_mask(mask_path, img.shape)
+    img, mask = load_pair(image_path, mask_path)
+    metrics, threshold, is_tumor, pred = segment_image(img, mask)
+    return metrics, threshold, is_tumor, img, mask, pred
+
+
+def prefetch_pairs(pairs: List[Tuple[str, str]], depth: int = 2) -> Iterator[Tuple[Tuple[str, str], Future]]:
+    """
+    Load (image_path, mask_path) pairs in a background thread ahead of use.
     
-    if mask.sum() == 0:
-        # Healthy slice - no tumor
-        pred = np.zeros_like(mask, dtype=np.uint8)
-        threshold = None
-    else:
-        # Tumor slice - use PSO to find optimal threshold
-        threshold = pso_threshold(img, mask)
-        pred = (img > threshold).astype(np.uint8)
+    Up to depth loads run ahead of the consumer, so reading the next slices
+    overlaps with thresholding the current one (cv2 I/O releases the GIL).
     
-    metrics = compute_all_metrics(mask, pred)
-    return metrics, threshold, img, mask, pred
+    Yields
+    ------
+    tuple
+        (pair, future) where future.result() is load_pair's (img, mask)
+    """
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pending = deque()
+        for pair in pairs:
+            pending.append((pair, executor.submit(load_pair, *pair)))
+            if len(pending) > depth:
+                yield pending.popleft()
+        while pending:
+            yield pending.popleft()
 
 
 def main(
@@ -101,11 +148,17 @@ def main(
         logger.error("No images found! Check IMAGE_DIR in config.py")
         return
     
-    # Process images
-    tumour_metrics = []
-    healthy_metrics = []
-    tumour_dice = []
-    tumour_thresholds = []
+    # Exact base-name lookup (a substring search would match case1 in case10)
+    name_to_path = {os.path.splitext(os.path.basename(p))[0]: p for p in image_paths}
+    
+    # Process images; per-slice results go straight into preallocated
+    # (N, 4) metric and (N,) threshold arrays, trimmed once at the end
+    n_images = len(image_paths)
+    tumour_metrics = np.empty((n_images, 4))
+    tumour_thresholds = np.empty(n_images)
+    healthy_metrics = np.empty((n_images, 4))
+    n_tumour = 0
+    n_healthy = 0
     tumour_image_names = []
     healthy_image_names = []
     saved_triplets = 0
@@ -122,26 +175,34 @@ def main(
         
         logger.info(f"Successfully processed {len(results)} images")
         
-        # Organize results
-        for base_name, metrics, threshold, img, mask, pred in results:
-            if mask.sum() > 0:  # Tumor slice
-                tumour_metrics.append(metrics)
-                tumour_dice.append(metrics[0])
-                tumour_thresholds.append(threshold)
-                tumour_image_names.append(base_name)
-            else:  # Healthy slice
-                healthy_metrics.append(metrics)
-                healthy_image_names.append(base_name)
+        # Organize results: split tumour and healthy slices with one boolean
+        # mask over all results. Workers return only scalars; triplet arrays
+        # are recomputed below
+        if results:
+            names, metrics, thresholds, is_tumor = zip(*results)
+            is_tumor = np.array(is_tumor, dtype=bool)
+            metrics = np.array(metrics, dtype=np.float64)
+            thresholds = np.array([np.nan if t is None else t for t in thresholds])
+            
+            n_tumour = int(np.count_nonzero(is_tumor))
+            n_healthy = len(results) - n_tumour
+            tumour_metrics[:n_tumour] = metrics[is_tumor]
+            tumour_thresholds[:n_tumour] = thresholds[is_tumor]
+            healthy_metrics[:n_healthy] = metrics[~is_tumor]
+            tumour_image_names = [name for name, tumour in zip(names, is_tumor) if tumour]
+            healthy_image_names = [name for name, tumour in zip(names, is_tumor) if not tumour]
         
         # Save qualitative examples sequentially (to avoid race conditions)
         logger.info("Saving qualitative examples...")
-        random.shuffle(tumour_image_names)
-        for base_name in tumour_image_names[:k_triplets]:
+        # Shuffle a copy so names stay aligned with tumour_metrics for export
+        triplet_candidates = list(tumour_image_names)
+        random.shuffle(triplet_candidates)
+        for base_name in triplet_candidates[:k_triplets]:
             if random.random() < triplet_prob:
                 try:
-                    img_path = next(p for p in image_paths if base_name in p)
+                    img_path = name_to_path[base_name]
                     mask_path = get_mask_path(img_path, config.MASK_DIR)
-                    _, _, img, mask, pred = process_image_sequential(img_path, mask_path)
+                    _, _, _, img, mask, pred = process_image_sequential(img_path, mask_path)
                     triplet_path = os.path.join(config.TRIPLET_DIR, f"{base_name}_triplet.png")
                     save_triplet_comparison(img, mask, pred, triplet_path)
                     saved_triplets += 1
@@ -152,21 +213,27 @@ def main(
     else:
         # Sequential processing
         logger.info("Using sequential processing")
-        for img_path in tqdm(image_paths, desc="Processing"):
-            mask_path = get_mask_path(img_path, config.MASK_DIR)
-            base_name = os.path.splitext(os.path.basename(img_path))[0]
-            
-            if not os.path.exists(mask_path):
+        pairs = []
+        for img_path in image_paths:
+            mask_path = find_mask_path(img_path, config.MASK_DIR)
+            if mask_path is None:
+                base_name = os.path.splitext(os.path.basename(img_path))[0]
                 logger.warning(f"Mask not found for {base_name}")
                 continue
+            pairs.append((img_path, mask_path))
+        
+        # The next slices load in the background while this one is processed
+        for (img_path, _), loaded in tqdm(prefetch_pairs(pairs), total=len(pairs), desc="Processing"):
+            base_name = os.path.splitext(os.path.basename(img_path))[0]
             
             try:
-                metrics, threshold, img, mask, pred = process_image_sequential(img_path, mask_path)
+                img, mask = loaded.result()
+                metrics, threshold, is_tumor, pred = segment_image(img, mask)
                 
-                if mask.sum() > 0:  # Tumor slice
-                    tumour_metrics.append(metrics)
-                    tumour_dice.append(metrics[0])
-                    tumour_thresholds.append(threshold)
+                if is_tumor:
+                    tumour_metrics[n_tumour] = metrics
+                    tumour_thresholds[n_tumour] = threshold
+                    n_tumour += 1
                     tumour_image_names.append(base_name)
                     
                     # Save qualitative examples
@@ -175,17 +242,24 @@ def main(
                         save_triplet_comparison(img, mask, pred, triplet_path)
                         saved_triplets += 1
                 else:  # Healthy slice
-                    healthy_metrics.append(metrics)
+                    healthy_metrics[n_healthy] = metrics
+                    n_healthy += 1
                     healthy_image_names.append(base_name)
                     
             except Exception as e:
                 logger.error(f"Error processing {base_name}: {e}")
                 continue
     
+    # Trim the result arrays to the slices actually processed (views, no copy)
+    tumour_metrics = tumour_metrics[:n_tumour]
+    tumour_thresholds = tumour_thresholds[:n_tumour]
+    tumour_dice = tumour_metrics[:, 0]
+    healthy_metrics = healthy_metrics[:n_healthy]
+    
     # Print and log summary
     logger.info("=" * 50)
-    if tumour_metrics:
-        metrics_array = np.array(tumour_metrics)
+    if n_tumour:
+        metrics_array = tumour_metrics
         stats = {
             'dice': (metrics_array[:, 0].mean(), metrics_array[:, 0].std()),
             'iou': (metrics_array[:, 1].mean(), metrics_array[:, 1].std()),
@@ -211,8 +285,8 @@ def main(
                               os.path.join(config.PLOT_DIR, "tau_vs_dice.png"))
         print(f"\nVisualizations saved to {config.PLOT_DIR}")
     
-    if healthy_metrics:
-        metrics_array = np.array(healthy_metrics)
+    if n_healthy:
+        metrics_array = healthy_metrics
         stats = {
             'dice': (metrics_array[:, 0].mean(), metrics_array[:, 0].std()),
             'iou': (metrics_array[:, 1].mean(), metrics_array[:, 1].std()),
@@ -242,7 +316,7 @@ def main(
         logger.info(f"Summary statistics saved to {json_path}")
         
         # Export per-image metrics to CSV
-        if tumour_metrics:
+        if n_tumour:
             csv_data = [
                 (name, metrics, threshold)
                 for name, metrics, threshold in zip(tumour_image_names, tumour_metrics, tumour_thresholds)
@@ -251,7 +325,7 @@ def main(
             export_results_to_csv(csv_data, csv_path)
             logger.info(f"Tumour metrics saved to {csv_path}")
         
-        if healthy_metrics:
+        if n_healthy:
             csv_data = [
                 (name, metrics, None)
                 for name, metrics in zip(healthy_image_names, healthy_metrics)
@@ -285,7 +359,7 @@ if __name__ == "__main__":
     parser.add_argument(
         "--workers",
         type=int,
-        default=None,
+        default=config.N_WORKERS,
         help="Number of worker processes (default: auto-detect)"
     )
     parser.add_argument(
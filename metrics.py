@@ -1,13 +1,77 @@
 #!/usr/bin/env python3
 """
 Evaluation metrics for segmentation tasks.
-Optimized for performance with vectorized operations.
+Optimized for performance with a fused Numba counting kernel.
 """
 
 import numpy as np
-from typing import Tuple
+import config  # noqa: F401  Sets NUMBA_CACHE_DIR, so import before numba
+from numba import njit, types
+from typing import Optional, Tuple
 
-EPS = 1e-8
+# Flat uint8 arrays, writable or read-only (the API caches images read-only)
+_U8_ARRAYS = [types.Array(types.uint8, 1, "C", readonly=readonly) for readonly in (False, True)]
+_COUNTS = types.UniTuple(types.int64, 3)
+
+
+# nogil lets threads count different masks concurrently; the explicit
+# signatures compile (or load from cache) once at import
+@njit([_COUNTS(gt, pred) for gt in _U8_ARRAYS for pred in _U8_ARRAYS], nogil=True, cache=True)
+def _count_kernel(gt: np.ndarray, pred: np.ndarray) -> Tuple[int, int, int]:
+    """Accumulate intersection, gt sum and pred sum over flat masks in one pass."""
+    intersection = 0
+    gt_sum = 0
+    pred_sum = 0
+    for i in range(gt.size):
+        g = gt[i]
+        p = pred[i]
+        intersection += g & p
+        gt_sum += g
+        pred_sum += p
+    return intersection, gt_sum, pred_sum
+
+
+@njit(
+    [_COUNTS(img, gt, types.float64) for img in _U8_ARRAYS for gt in _U8_ARRAYS],
+    nogil=True, cache=True
+)
+def _threshold_count_kernel(img: np.ndarray, gt: np.ndarray, level: float) -> Tuple[int, int, int]:
+    """Count intersection, gt sum and pred sum for pred = img > level, in one pass."""
+    intersection = 0
+    gt_sum = 0
+    pred_sum = 0
+    for i in range(img.size):
+        p = img[i] > level
+        g = gt[i] != 0
+        intersection += p & g
+        gt_sum += g
+        pred_sum += p
+    return intersection, gt_sum, pred_sum
+
+
+def _confusion_counts(gt: np.ndarray, pred: np.ndarray) -> Tuple[int, int, int]:
+    """
+    Count overlap statistics of two binary masks in a single pass.
+    
+    Replaces separate `gt & pred`, `gt.sum()` and `pred.sum()` sweeps, each
+    of which reads both masks and allocates temporaries.
+    
+    Parameters
+    ----------
+    gt : np.ndarray
+        Ground truth binary mask
+    pred : np.ndarray
+        Predicted binary mask
+        
+    Returns
+    -------
+    tuple
+        (intersection, gt_sum, pred_sum)
+    """
+    return _count_kernel(
+        np.ascontiguousarray(gt, dtype=np.uint8).ravel(),
+        np.ascontiguousarray(pred, dtype=np.uint8).ravel()
+    )
 
 
 def dice_coefficient(gt: np.ndarray, pred: np.ndarray) -> float:
@@ -27,15 +91,12 @@ def dice_coefficient(gt: np.ndarray, pred: np.ndarray) -> float:
     float
         Dice coefficient in [0, 1]
     """
-    gt_sum = gt.sum()
-    pred_sum = pred.sum()
+    intersection, gt_sum, pred_sum = _confusion_counts(gt, pred)
     
     if gt_sum == 0 and pred_sum == 0:
         return 1.0
     
-    # Use bitwise AND for faster intersection computation
-    intersection = np.sum(gt & pred)
-    return 2 * intersection / (gt_sum + pred_sum + EPS)
+    return 2 * intersection / (gt_sum + pred_sum)
 
 
 def iou_coefficient(gt: np.ndarray, pred: np.ndarray) -> float:
@@ -55,15 +116,13 @@ def iou_coefficient(gt: np.ndarray, pred: np.ndarray) -> float:
     float
         IoU coefficient in [0, 1]
     """
-    gt_sum = gt.sum()
-    pred_sum = pred.sum()
+    intersection, gt_sum, pred_sum = _confusion_counts(gt, pred)
     
     if gt_sum == 0 and pred_sum == 0:
         return 1.0
     
-    intersection = np.sum(gt & pred)
-    union = np.sum(gt | pred)
-    return intersection / (union + EPS)
+    union = gt_sum + pred_sum - intersection
+    return intersection / union
 
 
 def precision_coefficient(gt: np.ndarray, pred: np.ndarray) -> float:
@@ -83,14 +142,12 @@ def precision_coefficient(gt: np.ndarray, pred: np.ndarray) -> float:
     float
         Precision in [0, 1]
     """
-    pred_sum = pred.sum()
-    gt_sum = gt.sum()
+    intersection, gt_sum, pred_sum = _confusion_counts(gt, pred)
     
     if pred_sum == 0:
         return 1.0 if gt_sum == 0 else 0.0
     
-    intersection = np.sum(gt & pred)
-    return intersection / (pred_sum + EPS)
+    return intersection / pred_sum
 
 
 def recall_coefficient(gt: np.ndarray, pred: np.ndarray) -> float:
@@ -110,20 +167,18 @@ def recall_coefficient(gt: np.ndarray, pred: np.ndarray) -> float:
     float
         Recall in [0, 1]
     """
-    gt_sum = gt.sum()
-    pred_sum = pred.sum()
+    intersection, gt_sum, pred_sum = _confusion_counts(gt, pred)
     
     if gt_sum == 0:
         return 1.0 if pred_sum == 0 else 0.0
     
-    intersection = np.sum(gt & pred)
-    return intersection / (gt_sum + EPS)
+    return intersection / gt_sum
 
 
 def compute_all_metrics(gt: np.ndarray, pred: np.ndarray) -> Tuple[float, float, float, float]:
     """
     Compute all evaluation metrics at once.
-    Optimized to compute intersection only once.
+    Optimized to count both masks in a single pass.
     
     Parameters
     ----------
@@ -137,20 +192,61 @@ def compute_all_metrics(gt: np.ndarray, pred: np.ndarray) -> Tuple[float, float,
     tuple
         (dice, iou, precision, recall)
     """
-    # Compute intersection once and reuse
-    intersection = np.sum(gt & pred)
-    gt_sum = gt.sum()
-    pred_sum = pred.sum()
-    union = np.sum(gt | pred)
+    # Single fused pass
+    return _metrics_from_counts(*_confusion_counts(gt, pred))
+
+
+def threshold_metrics(
+    img: np.ndarray,
+    gt: np.ndarray,
+    threshold: Optional[float]
+) -> Tuple[float, float, float, float]:
+    """
+    Compute all metrics for the prediction img > threshold without building it.
+    
+    Equivalent to compute_all_metrics(gt, apply_threshold(img, threshold)),
+    but thresholding and counting happen in one pass, so no prediction mask
+    is allocated. Use it when only the scores are needed.
+    
+    Parameters
+    ----------
+    img : np.ndarray
+        Preprocessed uint8 image
+    gt : np.ndarray
+        Ground truth binary mask
+    threshold : float or None
+        Threshold on the [0, 1] scale; None predicts an empty mask
+        
+    Returns
+    -------
+    tuple
+        (dice, iou, precision, recall)
+    """
+    level = np.inf if threshold is None else threshold * 255
+    return _metrics_from_counts(*_threshold_count_kernel(
+        np.ascontiguousarray(img, dtype=np.uint8).ravel(),
+        np.ascontiguousarray(gt, dtype=np.uint8).ravel(),
+        level
+    ))
+
+
+def _metrics_from_counts(
+    intersection: int,
+    gt_sum: int,
+    pred_sum: int
+) -> Tuple[float, float, float, float]:
+    """Turn overlap counts into (dice, iou, precision, recall)."""
+    # Union follows from inclusion-exclusion
+    union = gt_sum + pred_sum - intersection
     
     # Handle edge cases
     if gt_sum == 0 and pred_sum == 0:
         return (1.0, 1.0, 1.0, 1.0)
     
-    # Compute all metrics efficiently
-    dice = 2 * intersection / (gt_sum + pred_sum + EPS) if (gt_sum + pred_sum) > 0 else 0.0
-    iou = intersection / (union + EPS) if union > 0 else 0.0
-    precision = intersection / (pred_sum + EPS) if pred_sum > 0 else (1.0 if gt_sum == 0 else 0.0)
-    recall = intersection / (gt_sum + EPS) if gt_sum > 0 else (1.0 if pred_sum == 0 else 0.0)
+    # Every denominator is guarded, so the ratios are exact without an epsilon
+    dice = 2 * intersection / (gt_sum + pred_sum) if (gt_sum + pred_sum) > 0 else 0.0
+    iou = intersection / union if union > 0 else 0.0
+    precision = intersection / pred_sum if pred_sum > 0 else (1.0 if gt_sum == 0 else 0.0)
+    recall = intersection / gt_sum if gt_sum > 0 else (1.0 if pred_sum == 0 else 0.0)
     
     return (dice, iou, precision, recall)
@@ -4,52 +4,53 @@ Parallel processing utilities for batch image processing.
 """
 
 import os
-from typing import List, Tuple, Optional, Callable
-from functools import partial
-from multiprocessing import Pool, cpu_count
+import sys
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Tuple, Optional
 import numpy as np
+from tqdm import tqdm
 
+import config
 from preprocessing import load_image, load_mask
-from pso_segmentation import pso_threshold
-from metrics import compute_all_metrics
-from utils import get_mask_path
+from pso_segmentation import pso_threshold, apply_threshold, warmup
+from metrics import compute_all_metrics, threshold_metrics
+from utils import find_mask_path
 
 
 def process_single_image(
-    img_path: str,
-    mask_dir: str,
-    process_tumor: bool = True
-) -> Optional[Tuple[str, Tuple[float, float, float, float], Optional[float], np.ndarray, np.ndarray, np.ndarray]]:
+    pair: Tuple[str, str],
+    process_tumor: bool = True,
+    return_arrays: bool = False
+) -> Optional[Tuple]:
     """
     Process a single image. Designed for parallel execution.
     
     Parameters
     ----------
-    img_path : str
-        Path to image file
-    mask_dir : str
-        Directory containing masks
+    pair : tuple
+        (image_path, mask_path) pair
     process_tumor : bool
         Whether to process tumor slices with PSO
+    return_arrays : bool
+        Whether to return the image, mask and prediction arrays. Off by
+        default so workers only send scalars back to the parent
         
     Returns
     -------
     tuple or None
-        (base_name, metrics, threshold, img, mask, pred) or None if error
+        (base_name, metrics, threshold, is_tumor), extended with
+        (img, mask, pred) when return_arrays is set, or None if error
     """
+    img_path, mask_path = pair
     try:
-        mask_path = get_mask_path(img_path, mask_dir)
         base_name = os.path.splitext(os.path.basename(img_path))[0]
-        
-        if not os.path.exists(mask_path):
-            return None
-        
         img = load_image(img_path)
         mask = load_mask(mask_path, img.shape)
+        is_tumor = bool(mask.any())
         
-        if mask.sum() == 0:
+        if not is_tumor:
             # Healthy slice
-            pred = np.zeros_like(mask, dtype=np.uint8)
             threshold = None
         else:
             # Tumor slice
@@ -57,23 +58,44 @@ def process_single_image(
                 threshold = pso_threshold(img, mask)
             else:
                 threshold = 0.5  # Default threshold
-            pred = (img > threshold).astype(np.uint8) if threshold else np.zeros_like(mask)
         
-        metrics = compute_all_metrics(mask, pred)
-        return (base_name, metrics, threshold, img, mask, pred)
+        if return_arrays:
+            if threshold is None:
+                pred = np.zeros_like(mask, dtype=np.uint8)
+            else:
+                pred = apply_threshold(img, threshold)
+            metrics = compute_all_metrics(mask, pred)
+            return (base_name, metrics, threshold, is_tumor, img, mask, pred)
+        
+        # Scores only: threshold and count in one pass, no prediction mask
+        metrics = threshold_metrics(img, mask, threshold)
+        return (base_name, metrics, threshold, is_tumor)
         
     except Exception as e:
         return None
 
 
+def _process_chunk(
+    chunk: List[Tuple[str, str]],
+    process_tumor: bool = True,
+    return_arrays: bool = False
+) -> List[Optional[Tuple]]:
+    """Process a contiguous chunk of (image_path, mask_path) pairs in one task."""
+    return [process_single_image(pair, process_tumor, return_arrays) for pair in chunk]
+
+
 def process_images_parallel(
     image_paths: List[str],
     mask_dir: str,
     n_workers: Optional[int] = None,
-    process_tumor: bool = True
-) -> List[Tuple[str, Tuple[float, float, float, float], Optional[float], np.ndarray, np.ndarray, np.ndarray]]:
+    process_tumor: bool = True,
+    return_arrays: bool = False
+) -> List[Tuple]:
     """
-    Process images in parallel using multiprocessing.
+    Process images in parallel using a process pool.
+    
+    Images without a matching mask are skipped before any work is
+    submitted to the pool.
     
     Parameters
     ----------
@@ -85,6 +107,8 @@ def process_images_parallel(
         Number of worker processes. Defaults to CPU count - 1
     process_tumor : bool
         Whether to process tumor slices with PSO
+    return_arrays : bool
+        Whether workers return image arrays (see process_single_image)
         
     Returns
     -------
@@ -92,14 +116,55 @@ def process_images_parallel(
         List of results from process_single_image
     """
     if n_workers is None:
-        n_workers = max(1, cpu_count() - 1)
+        n_workers = max(1, (os.cpu_count() or 1) - 1)
+    
+    # Pair images with masks up front so workers only see valid work
+    pairs = []
+    for img_path in image_paths:
+        mask_path = find_mask_path(img_path, mask_dir)
+        if mask_path is not None:
+            pairs.append((img_path, mask_path))
+    
+    if not pairs:
+        return []
+    
+    # Several tasks per chunk keeps IPC overhead low while still balancing load
+    chunksize = max(1, len(pairs) // (8 * n_workers))
+    chunks = [pairs[i:i + chunksize] for i in range(0, len(pairs), chunksize)]
+    
+    # Compile the kernels once here so forked workers inherit them; the
+    # initializer covers spawn (Windows), where each worker starts fresh
+    warmup()
+    ctx = mp.get_context('spawn' if sys.platform == 'win32' else 'fork')
     
-    # Create partial function for pool.map
-    process_func = partial(process_single_image, mask_dir=mask_dir, process_tumor=process_tumor)
+    # Master-worker loop: at most 2 chunks per worker are in flight, so
+    # finished results are collected as they arrive instead of piling up
+    # in the pool, and are put back in input order at the end
+    max_pending = 2 * n_workers
+    next_chunk = 0
+    chunk_results = {}
     
-    # Process in parallel
-    with Pool(n_workers) as pool:
-        results = pool.map(process_func, image_paths)
+    with ProcessPoolExecutor(max_workers=n_workers, mp_context=ctx, initializer=warmup) as executor, \
+            tqdm(total=len(pairs), desc="Processing", miniters=config.BATCH_SIZE) as pbar:
+        pending = {}
+        while next_chunk < len(chunks) or pending:
+            while next_chunk < len(chunks) and len(pending) < max_pending:
+                future = executor.submit(
+                    _process_chunk, chunks[next_chunk], process_tumor, return_arrays
+                )
+                pending[future] = next_chunk
+                next_chunk += 1
+            
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                chunk_results[index] = future.result()
+                pbar.update(len(chunks[index]))
     
-    # Filter out None results (errors)
-    return [r for r in results if r is not None]
+    # None marks an image that failed to process
+    return [
+        result
+        for index in range(len(chunks))
+        for result in chunk_results[index]
+        if result is not None
+    ]
@@ -5,12 +5,25 @@ Image preprocessing utilities for medical image segmentation.
 
 import cv2
 import numpy as np
+from typing import List, Sequence
+
+try:
+    import cupy as cp
+    from cupyx.scipy import ndimage as cp_ndimage
+    GPU_AVAILABLE = cp.cuda.runtime.getDeviceCount() > 0
+except Exception:  # cupy missing, or installed without a usable device
+    cp = None
+    GPU_AVAILABLE = False
 
 
 def preprocess_image(img: np.ndarray) -> np.ndarray:
     """
     Preprocess image with Gaussian blur and histogram equalization.
     
+    The result stays uint8: thresholds in [0, 1] are applied on the
+    [0, 255] scale (see pso_segmentation.apply_threshold), which keeps
+    the hot comparisons on 1 byte per pixel instead of 4.
+    
     Parameters
     ----------
     img : np.ndarray
@@ -19,18 +32,111 @@ def preprocess_image(img: np.ndarray) -> np.ndarray:
     Returns
     -------
     np.ndarray
-        Preprocessed image normalized to [0, 1]
+        Preprocessed uint8 image in [0, 255]
     """
     # Apply Gaussian blur to reduce noise
     blurred = cv2.GaussianBlur(img, (5, 5), 0)
     
-    # Histogram equalization for contrast enhancement
-    equalized = cv2.equalizeHist(blurred)
+    # Histogram equalization for contrast enhancement, in place: the LUT is
+    # applied pixel by pixel, so no second full-size buffer is needed
+    return cv2.equalizeHist(blurred, dst=blurred)
+
+
+def equalize_lut(hist, xp=np):
+    """
+    Build cv2.equalizeHist lookup tables from 256-bin histograms.
+    
+    Parameters
+    ----------
+    hist : array
+        Histograms of shape (B, 256)
+    xp : module
+        Array module (numpy or cupy)
+        
+    Returns
+    -------
+    array
+        uint8 lookup tables of shape (B, 256)
+    """
+    hist = hist.astype(xp.int64)
+    total = hist.sum(axis=1, keepdims=True)
+    
+    # Same construction as OpenCV: the lowest occupied bin maps to 0 and the
+    # rest are scaled by 255 / (total - count of that bin)
+    first = xp.argmax(hist > 0, axis=1)[:, None]
+    first_count = xp.take_along_axis(hist, first, axis=1)
+    denom = total - first_count
+    # float32 arithmetic reproduces OpenCV's rounding exactly
+    scale = xp.float32(255.0) / xp.where(denom > 0, denom, 1).astype(xp.float32)
+    lut = xp.rint((xp.cumsum(hist, axis=1) - first_count).astype(xp.float32) * scale)
+    lut = xp.where(xp.arange(256)[None, :] > first, lut, 0)
+    
+    # Single-valued images are left unchanged, as cv2.equalizeHist does
+    identity = xp.broadcast_to(xp.arange(256), lut.shape)
+    lut = xp.where(denom > 0, lut, identity)
+    
+    return xp.clip(lut, 0, 255).astype(xp.uint8)
+
+
+def _preprocess_stack_gpu(stack: np.ndarray) -> np.ndarray:
+    """Gaussian blur and equalize a (B, H, W) uint8 stack on the GPU."""
+    x = cp.asarray(stack, dtype=cp.float32)
+    
+    # Separable 5x5 kernel identical to cv2.GaussianBlur(img, (5, 5), 0);
+    # mode='mirror' is OpenCV's default BORDER_REFLECT_101
+    kernel = cp.asarray(cv2.getGaussianKernel(5, 0).ravel(), dtype=cp.float32)
+    x = cp_ndimage.correlate1d(x, kernel, axis=1, mode='mirror')
+    x = cp_ndimage.correlate1d(x, kernel, axis=2, mode='mirror')
+    # OpenCV rounds half up ((sum + 128) >> 8); cp.rint would round half to even
+    blurred = cp.clip(cp.floor(x + 0.5), 0, 255).astype(cp.uint8)
     
-    # Normalize to [0, 1]
-    normalized = equalized.astype(np.float32) / 255.0
+    # One bincount for all histograms: offset each image into its own 256 bins
+    n = blurred.shape[0]
+    offsets = (cp.arange(n, dtype=cp.int64) * 256)[:, None, None]
+    hist = cp.bincount((blurred + offsets).ravel(), minlength=n * 256).reshape(n, 256)
+    lut = equalize_lut(hist, xp=cp)
     
-    return normalized
+    equalized = cp.take_along_axis(lut, blurred.reshape(n, -1).astype(cp.int64), axis=1)
+    return cp.asnumpy(equalized.reshape(blurred.shape))
+
+
+def preprocess_batch(imgs: Sequence[np.ndarray], executor=None) -> List[np.ndarray]:
+    """
+    Preprocess a batch of images, on the GPU when cupy is available.
+    
+    Images of the same shape are stacked and processed with one upload per
+    shape; results match preprocess_image exactly. Without a
+    GPU each image goes through preprocess_image, mapped over executor if
+    one is given.
+    
+    Parameters
+    ----------
+    imgs : sequence of np.ndarray
+        Input grayscale uint8 images
+    executor : concurrent.futures.Executor, optional
+        Executor for the CPU fallback
+        
+    Returns
+    -------
+    list of np.ndarray
+        Preprocessed uint8 images, in input order
+    """
+    if not GPU_AVAILABLE:
+        mapper = executor.map if executor is not None else map
+        return list(mapper(preprocess_image, imgs))
+    
+    # Group indices by shape so each group can be stacked
+    groups = {}
+    for i, img in enumerate(imgs):
+        groups.setdefault(img.shape, []).append(i)
+    
+    results = [None] * len(imgs)
+    for indices in groups.values():
+        out = _preprocess_stack_gpu(np.stack([imgs[i] for i in indices]))
+        for i, processed in zip(indices, out):
+            results[i] = processed
+    
+    return results
 
 
 def load_image(path: str) -> np.ndarray:
@@ -73,14 +179,39 @@ def load_mask(path: str, target_shape: tuple) -> np.ndarray:
     if mask is None:
         raise IOError(f"Cannot read mask: {path}")
     
+    return binarize_mask(mask, target_shape)
+
+
+def binarize_mask(mask: np.ndarray, target_shape: tuple) -> np.ndarray:
+    """
+    Resize mask to match target image shape and convert to binary.
+    
+    Masks that already have the target shape are not resized, and masks
+    that are already uint8 in {0, 1} are returned without a copy.
+    
+    Parameters
+    ----------
+    mask : np.ndarray
+        Grayscale mask
+    target_shape : tuple
+        Target (height, width) shape
+        
+    Returns
+    -------
+    np.ndarray
+        Binary mask (0 or 1)
+    """
     # Resize to match target shape
-    resized = cv2.resize(
-        mask, 
-        (target_shape[1], target_shape[0]),
-        interpolation=cv2.INTER_NEAREST
-    )
+    if mask.shape != tuple(target_shape[:2]):
+        mask = cv2.resize(
+            mask,
+            (target_shape[1], target_shape[0]),
+            interpolation=cv2.INTER_NEAREST
+        )
     
     # Convert to binary
-    binary = (resized > 0).astype(np.uint8)
+    if mask.dtype == np.uint8 and mask.max() <= 1:
+        return mask
     
-    return binary
+    # Reinterpret the bool result as 0/1 uint8 instead of converting a copy
+    return np.greater(mask, 0).view(np.uint8)
@@ -1,83 +1,356 @@
 #!/usr/bin/env python3
 """
 PSO implementation for image segmentation threshold optimization.
-Optimized with vectorized operations for better performance.
+Optimized with a Numba-compiled swarm and fitness kernel for better performance.
 """
 
+import logging
 import numpy as np
-import pyswarms as ps
 import cv2
-from typing import Tuple
-from metrics import dice_coefficient
-import config
+import config  # Sets NUMBA_CACHE_DIR, so import before numba
+from numba import njit, types
+from typing import Optional, Tuple
 
+logger = logging.getLogger("PSO")
 
-def pso_threshold(img: np.ndarray, gt_mask: np.ndarray) -> float:
+# Flat uint8 arrays, writable or read-only (the API caches images read-only)
+_U8_ARRAYS = [types.Array(types.uint8, 1, "C", readonly=readonly) for readonly in (False, True)]
+
+
+# Explicit contiguous signature: compiled (or loaded from cache) at import,
+# with no type inference or dispatch on the per-iteration path
+@njit("float64[::1](int64[::1], int64[::1], float64[::1])", fastmath=True, cache=True)
+def _fitness(cum_all: np.ndarray, cum_pos: np.ndarray, thresholds: np.ndarray) -> np.ndarray:
+    """
+    Dice coefficient of thresholding the image at every value in thresholds.
+    
+    Works on reverse cumulative histograms of the uint8 image, so each
+    evaluation is two table lookups instead of a pass over the image.
+    
+    Parameters
+    ----------
+    cum_all : np.ndarray
+        cum_all[k] is the number of pixels with intensity >= k (length 257)
+    cum_pos : np.ndarray
+        cum_pos[k] is the number of foreground pixels with intensity >= k
+        (length 257)
+    thresholds : np.ndarray
+        Thresholds to evaluate, on the [0, 255] scale
+        
+    Returns
+    -------
+    np.ndarray
+        Dice coefficient per threshold
+    """
+    gt_sum = cum_pos[0]
+    dice = np.empty(thresholds.size)
+    
+    for j in range(thresholds.size):
+        # Pixels > t are exactly those with intensity >= floor(t) + 1
+        k = min(max(int(np.floor(thresholds[j])) + 1, 0), 256)
+        pred_sum = cum_all[k]
+        intersection = cum_pos[k]
+        denom = gt_sum + pred_sum
+        dice[j] = 1.0 if denom == 0 else 2.0 * intersection / denom
+    
+    return dice
+
+
+@njit(
+    "Tuple((float64, float64, int64))(int64[::1], int64[::1], int64, int64, float64, float64, float64, "
+    "float64, float64, float64, float64, int64, int64, float64, float64)",
+    cache=True
+)
+def _pso_run(
+    cum_all: np.ndarray,
+    cum_pos: np.ndarray,
+    n_particles: int,
+    iters: int,
+    w: float,
+    c1: float,
+    c2: float,
+    lower: float,
+    upper: float,
+    center: float,
+    spread: float,
+    seed: int,
+    max_stall: int,
+    tol: float,
+    min_spread: float
+) -> Tuple[float, float, int]:
     """
-    Use PSO to find optimal threshold for binary segmentation.
-    Optimized with vectorized objective function.
+    Global-best PSO over a single threshold, entirely in compiled code.
+    
+    Parameters
+    ----------
+    cum_all, cum_pos : np.ndarray
+        Reverse cumulative histograms (see _fitness)
+    n_particles : int
+        Swarm size
+    iters : int
+        Number of iterations
+    w, c1, c2 : float
+        Inertia, cognitive and social coefficients
+    lower, upper : float
+        Search bounds on the [0, 1] scale; positions are clipped to them
+    center, spread : float
+        Particles start at N(center, spread); a spread <= 0 starts them
+        uniformly over the bounds instead
+    seed : int
+        Seed for the swarm's random numbers
+    max_stall : int
+        Stop once the best Dice has not improved by more than tol for this
+        many consecutive iterations (0 disables)
+    tol : float
+        Minimum improvement that resets the stall counter
+    min_spread : float
+        Stop once the standard deviation of the positions falls below this
+        (0 disables)
+        
+    Returns
+    -------
+    tuple
+        (best_threshold, best_dice, iterations_run)
+    """
+    np.random.seed(seed)
+    
+    pos = np.empty(n_particles)
+    for i in range(n_particles):
+        if spread > 0:
+            pos[i] = min(max(center + spread * np.random.standard_normal(), lower), upper)
+        else:
+            pos[i] = lower + (upper - lower) * np.random.random()
+    vel = np.zeros(n_particles)
+    
+    pbest = pos.copy()
+    pbest_score = _fitness(cum_all, cum_pos, pos * 255)
+    g = np.argmax(pbest_score)
+    gbest = pbest[g]
+    gbest_score = pbest_score[g]
+    
+    stall = 0
+    done = 0
+    for _ in range(iters):
+        done += 1
+        previous_best = gbest_score
+        
+        for i in range(n_particles):
+            vel[i] = (
+                w * vel[i]
+                + c1 * np.random.random() * (pbest[i] - pos[i])
+                + c2 * np.random.random() * (gbest - pos[i])
+            )
+            pos[i] = min(max(pos[i] + vel[i], lower), upper)
+        
+        score = _fitness(cum_all, cum_pos, pos * 255)
+        for i in range(n_particles):
+            if score[i] > pbest_score[i]:
+                pbest_score[i] = score[i]
+                pbest[i] = pos[i]
+                if score[i] > gbest_score:
+                    gbest_score = score[i]
+                    gbest = pos[i]
+        
+        # Early exit once the swarm has converged
+        stall = stall + 1 if gbest_score - previous_best <= tol else 0
+        if max_stall > 0 and stall >= max_stall:
+            break
+        if min_spread > 0 and np.std(pos) < min_spread:
+            break
+    
+    return gbest, gbest_score, done
+
+
+@njit(
+    [types.UniTuple(types.int64[::1], 2)(img, mask) for img in _U8_ARRAYS for mask in _U8_ARRAYS],
+    nogil=True, cache=True
+)
+def _joint_histogram(img: np.ndarray, mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Intensity histograms of all pixels and of mask pixels in one pass.
+    
+    Each pixel increments a single bin of a joint (intensity, in-mask)
+    histogram, so there is no branch and no boolean-indexed copy.
+    
+    Returns
+    -------
+    tuple
+        (hist_all, hist_pos), each with 256 bins
+    """
+    joint = np.zeros(512, dtype=np.int64)
+    for i in range(img.size):
+        joint[2 * img[i] + (mask[i] != 0)] += 1
+    
+    hist_pos = joint[1::2].copy()
+    return joint[0::2] + hist_pos, hist_pos
+
+
+def _cumulative_histograms(img: np.ndarray, gt_mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reverse cumulative histograms of a uint8 image, overall and inside the mask.
+    
+    Returns
+    -------
+    tuple
+        (cum_all, cum_pos), each of length 257 with cum[k] = count of
+        pixels with intensity >= k
+    """
+    hist_all, hist_pos = _joint_histogram(
+        np.ascontiguousarray(img).ravel(),
+        np.ascontiguousarray(gt_mask, dtype=np.uint8).ravel()
+    )
+    
+    cum_all = np.zeros(257, dtype=np.int64)
+    cum_pos = np.zeros(257, dtype=np.int64)
+    cum_all[:256] = np.cumsum(hist_all[::-1])[::-1]
+    cum_pos[:256] = np.cumsum(hist_pos[::-1])[::-1]
+    return cum_all, cum_pos
+
+
+def warmup() -> None:
+    """
+    Compile (or load from the on-disk cache) the Numba kernels.
+    
+    Call once at service start-up so the first request does not pay the
+    JIT cost.
+    """
+    img = np.zeros((4, 4), np.uint8)
+    cum_all, cum_pos = _cumulative_histograms(img, img)
+    _pso_run(cum_all, cum_pos, 1, 1, 0.5, 1.5, 1.5, 0.0, 1.0, 0.5, 0.0, 0, 0, 0.0, 0.0)
+
+
+def _as_uint8(img: np.ndarray) -> np.ndarray:
+    """
+    Bring an image onto the uint8 [0, 255] scale the kernels work on.
+    
+    Floating-point images are taken to be on [0, 1], as the original float
+    preprocessing produced, and rounded to the nearest level so that
+    uint8 images divided by 255 map back exactly. Other integer types are
+    clipped to [0, 255].
+    """
+    if img.dtype == np.uint8:
+        return img
+    if np.issubdtype(img.dtype, np.floating):
+        img = np.rint(img * 255)
+    return np.clip(img, 0, 255).astype(np.uint8)
+
+
+def apply_threshold(img: np.ndarray, threshold: float) -> np.ndarray:
+    """
+    Binarize a preprocessed uint8 image with a threshold in [0, 1].
     
     Parameters
     ----------
     img : np.ndarray
-        Preprocessed input image
+        Preprocessed uint8 image (float images on [0, 1] are converted)
+    threshold : float
+        Threshold on the normalized [0, 1] intensity scale
+        
+    Returns
+    -------
+    np.ndarray
+        Binary prediction (0 or 1)
+    """
+    # A bool array reinterpreted as uint8 is already 0/1; no converting copy
+    return np.greater(_as_uint8(img), threshold * 255).view(np.uint8)
+
+
+def _otsu_threshold(img: np.ndarray) -> float:
+    """Otsu's threshold of a uint8 image on the [0, 1] scale."""
+    threshold_otsu, _ = cv2.threshold(
+        img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU
+    )
+    return threshold_otsu / 255.0
+
+
+def pso_threshold(
+    img: np.ndarray,
+    gt_mask: np.ndarray,
+    n_particles: Optional[int] = None,
+    iters: Optional[int] = None,
+    method: Optional[str] = None
+) -> float:
+    """
+    Find the Dice-optimal threshold for binary segmentation.
+    Optimized with cumulative histograms so each fitness evaluation is O(1).
+    
+    Dice is piecewise constant between intensity levels of the uint8
+    image, so the default "exhaustive" method scores all 256 levels and
+    returns the exact optimum; "pso" runs the particle swarm instead.
+    
+    Parameters
+    ----------
+    img : np.ndarray
+        Preprocessed uint8 input image (float images on [0, 1] are
+        converted)
     gt_mask : np.ndarray
         Ground truth binary mask
+    n_particles : int, optional
+        Swarm size (default: config.PSO_N_PARTICLES)
+    iters : int, optional
+        Number of PSO iterations (default: config.PSO_ITERATIONS)
+    method : str, optional
+        "exhaustive" or "pso" (default: config.THRESHOLD_METHOD)
         
     Returns
     -------
     float
-        Optimal threshold value
-    """
-    # Precompute ground truth sum for efficiency
-    gt_sum = gt_mask.sum()
-    
-    def objective(th_vec: np.ndarray) -> np.ndarray:
-        """
-        Vectorized objective function to minimize negative Dice coefficient.
-        Much faster than looping through particles.
-        """
-        n_particles = th_vec.shape[0]
-        scores = np.zeros(n_particles)
-        
-        # Vectorized thresholding for all particles at once
-        thresholds = th_vec.flatten()
-        
-        for i, thresh in enumerate(thresholds):
-            # Binary prediction
-            pred = (img > thresh).astype(np.uint8)
-            
-            # Fast Dice computation using precomputed values
-            intersection = np.sum(gt_mask & pred)
-            pred_sum = pred.sum()
-            
-            if gt_sum == 0 and pred_sum == 0:
-                dice = 1.0
-            else:
-                dice = 2 * intersection / (gt_sum + pred_sum + 1e-8)
-            
-            scores[i] = -dice  # Minimize negative Dice
-        
-        return scores
+        Optimal threshold value in [0, 1]
+    """
+    method = method or config.THRESHOLD_METHOD
+    if method not in ("exhaustive", "pso"):
+        raise ValueError(f"Unknown threshold method: {method}")
+    
+    img = _as_uint8(img)
+    
+    # Optionally search on a downscaled copy; the threshold only depends on
+    # the intensity distribution and is applied at full resolution by callers
+    if config.THRESHOLD_DOWNSCALE > 1:
+        scale = 1.0 / config.THRESHOLD_DOWNSCALE
+        img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        gt_mask = cv2.resize(gt_mask, (img.shape[1], img.shape[0]), interpolation=cv2.INTER_NEAREST)
+    
+    # Histogram once; every fitness evaluation then becomes two lookups
+    cum_all, cum_pos = _cumulative_histograms(img, gt_mask)
+    
+    if method == "exhaustive":
+        # Threshold k / 255 keeps exactly the pixels >= k + 1; the first
+        # maximum is the lowest threshold reaching the best Dice
+        dice = _fitness(cum_all, cum_pos, np.arange(256, dtype=np.float64))
+        return int(np.argmax(dice)) / 255.0
+    
+    otsu = _otsu_threshold(img)
+    
+    # Skip the swarm when Otsu's threshold is already good enough; checking
+    # its Dice is a single histogram lookup
+    if config.OTSU_ACCEPT_DICE is not None:
+        otsu_dice = _fitness(cum_all, cum_pos, np.array([otsu * 255]))[0]
+        if otsu_dice >= config.OTSU_ACCEPT_DICE:
+            logger.debug(f"Otsu accepted (Dice {otsu_dice:.3f})")
+            return otsu
+    
+    # Optionally seed the swarm around Otsu's threshold
+    if config.PSO_SEED_STD is not None:
+        center, spread = otsu, config.PSO_SEED_STD
+    else:
+        center, spread = 0.0, 0.0
     
     # PSO optimization with configurable parameters
-    optimizer = ps.single.GlobalBestPSO(
-        n_particles=config.PSO_N_PARTICLES,
-        dimensions=1,
-        options=config.PSO_OPTIONS,
-        bounds=(np.array([config.PSO_BOUNDS[0]]), np.array([config.PSO_BOUNDS[1]]))
+    best_pos, _, _ = _pso_run(
+        cum_all, cum_pos,
+        n_particles or config.PSO_N_PARTICLES,
+        iters or config.PSO_ITERATIONS,
+        config.PSO_OPTIONS['w'], config.PSO_OPTIONS['c1'], config.PSO_OPTIONS['c2'],
+        config.PSO_BOUNDS[0], config.PSO_BOUNDS[1],
+        center, spread,
+        config.RANDOM_SEED,
+        config.PSO_MAX_STALL, config.PSO_TOL, config.PSO_MIN_SPREAD
     )
-    
-    _, best_pos = optimizer.optimize(objective, iters=config.PSO_ITERATIONS, verbose=False)
-    threshold = float(best_pos[0])
+    threshold = float(best_pos)
     
     # Fallback for edge cases where PSO converges to boundary
     if threshold <= 0.01 or threshold >= 0.99:
         # Use Otsu's method as fallback
-        img_uint8 = (img * 255).astype(np.uint8)
-        _, threshold_otsu = cv2.threshold(
-            img_uint8, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU
-        )
-        threshold = threshold_otsu / 255.0
+        threshold = otsu
     
     return threshold
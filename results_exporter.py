@@ -11,6 +11,20 @@ import numpy as np
 from datetime import datetime
 
 
+def _json_default(value):
+    """
+    Serialize NumPy values for json.dump.
+    
+    Only called for objects json cannot encode itself, so plain Python
+    values, including those nested in dicts and lists, skip it entirely.
+    """
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (np.integer, np.floating, np.bool_)):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
 def export_results_to_json(
     results: Dict,
     output_path: str
@@ -25,20 +39,10 @@ def export_results_to_json(
     output_path : str
         Path to save JSON file
     """
-    # Convert numpy arrays to lists for JSON serialization
-    json_results = {}
-    for key, value in results.items():
-        if isinstance(value, np.ndarray):
-            json_results[key] = value.tolist()
-        elif isinstance(value, (np.integer, np.floating)):
-            json_results[key] = float(value)
-        else:
-            json_results[key] = value
-    
-    json_results['timestamp'] = datetime.now().isoformat()
+    json_results = {**results, 'timestamp': datetime.now().isoformat()}
     
     with open(output_path, 'w') as f:
-        json.dump(json_results, f, indent=2)
+        json.dump(json_results, f, indent=2, default=_json_default)
 
 
 def export_results_to_csv(
@@ -55,21 +59,66 @@ def export_results_to_csv(
     output_path : str
         Path to save CSV file
     """
+    # Format the numeric fields as one (N, 5) array; a missing threshold is
+    # carried as NaN and written as "N/A"
+    values = np.array(
+        [(*metrics, np.nan if threshold is None else threshold)
+         for _, metrics, threshold in metrics_list],
+        dtype=float
+    ).reshape(-1, 5)
+    formatted = np.char.mod('%.6f', values)
+    formatted[np.isnan(values[:, 4]), 4] = 'N/A'
+    
     with open(output_path, 'w', newline='') as f:
         writer = csv.writer(f)
         writer.writerow(['Image', 'Dice', 'IoU', 'Precision', 'Recall', 'Threshold'])
+        writer.writerows(
+            [image_name, *row]
+            for (image_name, _, _), row in zip(metrics_list, formatted.tolist())
+        )
+
+
+METRIC_NAMES = ('dice', 'iou', 'precision', 'recall')
+
+
+def _describe(arr: np.ndarray) -> List[Dict[str, float]]:
+    """
+    Summarise every column of a 2D array at once.
+    
+    Min, median and max come from a single np.quantile call, and mean and
+    std are reduced along axis 0, so each statistic is one vectorized pass
+    over the whole array instead of one per column.
+    
+    Parameters
+    ----------
+    arr : np.ndarray
+        (N, K) array of values
         
-        for image_name, metrics, threshold in metrics_list:
-            dice, iou, precision, recall = metrics
-            threshold_str = f"{threshold:.6f}" if threshold is not None else "N/A"
-            writer.writerow([
-                image_name,
-                f"{dice:.6f}",
-                f"{iou:.6f}",
-                f"{precision:.6f}",
-                f"{recall:.6f}",
-                threshold_str
-            ])
+    Returns
+    -------
+    list
+        K dicts with mean, std, min, max and median
+    """
+    lo, median, hi = np.quantile(arr, [0.0, 0.5, 1.0], axis=0)
+    mean = arr.mean(axis=0)
+    std = arr.std(axis=0)
+    
+    return [
+        {
+            'mean': float(mean[k]),
+            'std': float(std[k]),
+            'min': float(lo[k]),
+            'max': float(hi[k]),
+            'median': float(median[k])
+        }
+        for k in range(arr.shape[1])
+    ]
+
+
+def _metric_statistics(metrics) -> Dict[str, Dict[str, float]]:
+    """Per-metric summary statistics for (dice, iou, precision, recall) rows."""
+    columns = _describe(np.asarray(metrics, dtype=float))
+    return dict(zip(METRIC_NAMES, columns))
 
 
 def generate_summary_statistics(
@@ -82,12 +131,12 @@ def generate_summary_statistics(
     
     Parameters
     ----------
-    tumour_metrics : list
-        List of (dice, iou, precision, recall) tuples for tumor cases
-    healthy_metrics : list
-        List of (dice, iou, precision, recall) tuples for healthy cases
-    tumour_thresholds : list
-        List of optimal thresholds for tumor cases
+    tumour_metrics : list or np.ndarray
+        (dice, iou, precision, recall) tuples or an (N, 4) array for tumor cases
+    healthy_metrics : list or np.ndarray
+        (dice, iou, precision, recall) tuples or an (N, 4) array for healthy cases
+    tumour_thresholds : list or np.ndarray
+        Optimal thresholds for tumor cases
         
     Returns
     -------
@@ -96,79 +145,18 @@ def generate_summary_statistics(
     """
     stats = {}
     
-    if tumour_metrics:
-        tumour_arr = np.array(tumour_metrics)
+    # len() rather than truthiness so (N, 4) arrays work as well as lists
+    if len(tumour_metrics):
         stats['tumour'] = {
             'count': len(tumour_metrics),
-            'dice': {
-                'mean': float(np.mean(tumour_arr[:, 0])),
-                'std': float(np.std(tumour_arr[:, 0])),
-                'min': float(np.min(tumour_arr[:, 0])),
-                'max': float(np.max(tumour_arr[:, 0])),
-                'median': float(np.median(tumour_arr[:, 0]))
-            },
-            'iou': {
-                'mean': float(np.mean(tumour_arr[:, 1])),
-                'std': float(np.std(tumour_arr[:, 1])),
-                'min': float(np.min(tumour_arr[:, 1])),
-                'max': float(np.max(tumour_arr[:, 1])),
-                'median': float(np.median(tumour_arr[:, 1]))
-            },
-            'precision': {
-                'mean': float(np.mean(tumour_arr[:, 2])),
-                'std': float(np.std(tumour_arr[:, 2])),
-                'min': float(np.min(tumour_arr[:, 2])),
-                'max': float(np.max(tumour_arr[:, 2])),
-                'median': float(np.median(tumour_arr[:, 2]))
-            },
-            'recall': {
-                'mean': float(np.mean(tumour_arr[:, 3])),
-                'std': float(np.std(tumour_arr[:, 3])),
-                'min': float(np.min(tumour_arr[:, 3])),
-                'max': float(np.max(tumour_arr[:, 3])),
-                'median': float(np.median(tumour_arr[:, 3]))
-            },
-            'threshold': {
-                'mean': float(np.mean(tumour_thresholds)),
-                'std': float(np.std(tumour_thresholds)),
-                'min': float(np.min(tumour_thresholds)),
-                'max': float(np.max(tumour_thresholds)),
-                'median': float(np.median(tumour_thresholds))
-            }
+            **_metric_statistics(tumour_metrics),
+            'threshold': _describe(np.asarray(tumour_thresholds, dtype=float)[:, None])[0]
         }
     
-    if healthy_metrics:
-        healthy_arr = np.array(healthy_metrics)
+    if len(healthy_metrics):
         stats['healthy'] = {
             'count': len(healthy_metrics),
-            'dice': {
-                'mean': float(np.mean(healthy_arr[:, 0])),
-                'std': float(np.std(healthy_arr[:, 0])),
-                'min': float(np.min(healthy_arr[:, 0])),
-                'max': float(np.max(healthy_arr[:, 0])),
-                'median': float(np.median(healthy_arr[:, 0]))
-            },
-            'iou': {
-                'mean': float(np.mean(healthy_arr[:, 1])),
-                'std': float(np.std(healthy_arr[:, 1])),
-                'min': float(np.min(healthy_arr[:, 1])),
-                'max': float(np.max(healthy_arr[:, 1])),
-                'median': float(np.median(healthy_arr[:, 1]))
-            },
-            'precision': {
-                'mean': float(np.mean(healthy_arr[:, 2])),
-                'std': float(np.std(healthy_arr[:, 2])),
-                'min': float(np.min(healthy_arr[:, 2])),
-                'max': float(np.max(healthy_arr[:, 2])),
-                'median': float(np.median(healthy_arr[:, 2]))
-            },
-            'recall': {
-                'mean': float(np.mean(healthy_arr[:, 3])),
-                'std': float(np.std(healthy_arr[:, 3])),
-                'min': float(np.min(healthy_arr[:, 3])),
-                'max': float(np.max(healthy_arr[:, 3])),
-                'median': float(np.median(healthy_arr[:, 3]))
-            }
+            **_metric_statistics(healthy_metrics)
         }
     
     return stats
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the Flask API.
+"""
+
+import base64
+import cv2
+import numpy as np
+from api import app
+
+
+def _encode(img):
+    """PNG-encode an image as a base64 data URL."""
+    _, buffer = cv2.imencode(".png", img)
+    return "data:image/png;base64," + base64.b64encode(buffer).decode()
+
+
+def test_process_with_mask():
+    """Test single-image segmentation, including the cached (read-only) image."""
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 256, (48, 64)).astype(np.uint8)
+    mask = np.where(img > 170, 255, 0).astype(np.uint8)
+    payload = {"image": _encode(img), "mask": _encode(mask)}
+    
+    client = app.test_client()
+    # The second request is served from the image cache
+    for _ in range(2):
+        response = client.post("/api/process", json=payload)
+        assert response.status_code == 200
+        
+        result = response.get_json()
+        assert result["has_mask"]
+        assert 0.0 <= result["threshold"] <= 1.0
+        assert 0.0 <= result["metrics"]["dice"] <= 1.0
+
+
+def test_batch_mixed_items():
+    """Test batch results for tumour, healthy and mask-less items, in order."""
+    rng = np.random.default_rng(1)
+    img = rng.integers(0, 256, (48, 64)).astype(np.uint8)
+    tumour_mask = np.where(img > 170, 255, 0).astype(np.uint8)
+    healthy_mask = np.zeros_like(img)
+    items = [
+        {"image": _encode(img), "mask": _encode(tumour_mask)},
+        {"image": _encode(img), "mask": _encode(healthy_mask)},
+        {"image": _encode(img)}
+    ]
+    
+    response = app.test_client().post("/api/batch", json={"images": items})
+    assert response.status_code == 200
+    
+    tumour, healthy, no_mask = response.get_json()["results"]
+    assert tumour["is_tumour"] and 0.0 <= tumour["threshold"] <= 1.0
+    assert healthy["is_healthy"] and healthy["metrics"]["dice"] == 1.0
+    assert no_mask == {"processed": True}
+
+
+if __name__ == "__main__":
+    print("Running API tests...")
+    test_process_with_mask()
+    print("✓ Process with mask test passed")
+    
+    test_batch_mixed_items()
+    print("✓ Mixed batch test passed")
+    
+    print("\nAll tests passed!")
@@ -9,7 +9,8 @@ from metrics import (
     iou_coefficient,
     precision_coefficient,
     recall_coefficient,
-    compute_all_metrics
+    compute_all_metrics,
+    threshold_metrics
 )
 
 
@@ -79,6 +80,58 @@ def test_compute_all_metrics():
     assert recall == 1.0
 
 
+def test_matches_numpy_reference():
+    """Test fused counting against plain NumPy reductions."""
+    rng = np.random.default_rng(0)
+    gt = (rng.random((37, 53)) > 0.6).astype(np.uint8)
+    pred = (rng.random((37, 53)) > 0.4).astype(np.uint8)
+    
+    intersection = np.sum(gt & pred)
+    union = np.sum(gt | pred)
+    
+    dice, iou, precision, recall = compute_all_metrics(gt, pred)
+    
+    assert np.isclose(dice, 2 * intersection / (gt.sum() + pred.sum()))
+    assert np.isclose(iou, intersection / union)
+    assert np.isclose(precision, intersection / pred.sum())
+    assert np.isclose(recall, intersection / gt.sum())
+    assert np.isclose(dice_coefficient(gt, pred), dice)
+    assert np.isclose(iou_coefficient(gt, pred), iou)
+    
+    # Non-contiguous views must give the same result
+    assert np.isclose(dice_coefficient(gt[:, ::2], pred[:, ::2]),
+                      2 * np.sum(gt[:, ::2] & pred[:, ::2]) / (gt[:, ::2].sum() + pred[:, ::2].sum()))
+
+
+def test_threshold_metrics_matches_materialized():
+    """Test fused thresholding against metrics on an explicit prediction."""
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 256, (37, 53)).astype(np.uint8)
+    gt = (rng.random((37, 53)) > 0.6).astype(np.uint8)
+    
+    for threshold in [0.0, 0.25, 0.5, 100 / 255, 1.0]:
+        pred = (img > threshold * 255).astype(np.uint8)
+        assert np.allclose(threshold_metrics(img, gt, threshold), compute_all_metrics(gt, pred))
+    
+    # No threshold means an empty prediction
+    assert np.allclose(threshold_metrics(img, gt, None), compute_all_metrics(gt, np.zeros_like(gt)))
+
+
+def test_read_only_inputs():
+    """Test that read-only arrays (as cached by the API) are accepted."""
+    rng = np.random.default_rng(1)
+    img = rng.integers(0, 256, (20, 30)).astype(np.uint8)
+    gt = (rng.random((20, 30)) > 0.5).astype(np.uint8)
+    pred = (img > 128).astype(np.uint8)
+    expected = compute_all_metrics(gt, pred)
+    
+    for arr in (img, gt, pred):
+        arr.flags.writeable = False
+    
+    assert compute_all_metrics(gt, pred) == expected
+    assert np.allclose(threshold_metrics(img, gt, 128 / 255), expected)
+
+
 if __name__ == "__main__":
     print("Running metric tests...")
     test_perfect_match()
@@ -96,4 +149,13 @@ if __name__ == "__main__":
     test_compute_all_metrics()
     print("✓ Compute all metrics test passed")
     
+    test_matches_numpy_reference()
+    print("✓ NumPy reference test passed")
+    
+    test_threshold_metrics_matches_materialized()
+    print("✓ Fused threshold metrics test passed")
+    
+    test_read_only_inputs()
+    print("✓ Read-only input test passed")
+    
     print("\nAll tests passed!")
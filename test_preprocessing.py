@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Unit tests for preprocessing module.
+"""
+
+import cv2
+import numpy as np
+import pytest
+from preprocessing import (
+    GPU_AVAILABLE,
+    equalize_lut,
+    preprocess_batch,
+    preprocess_image
+)
+
+
+def _equalize(img):
+    """Equalize one image through equalize_lut."""
+    hist = np.bincount(img.ravel(), minlength=256)[None, :]
+    return equalize_lut(hist)[0][img]
+
+
+def test_equalize_lut_matches_opencv():
+    """Test that the lookup table reproduces cv2.equalizeHist bit for bit."""
+    rng = np.random.default_rng(0)
+    images = [
+        rng.integers(0, 256, (64, 96)).astype(np.uint8),
+        rng.integers(40, 90, (50, 70)).astype(np.uint8),
+        np.clip(rng.normal(200, 30, (80, 80)), 0, 255).astype(np.uint8),
+        cv2.GaussianBlur(rng.integers(0, 256, (128, 128)).astype(np.uint8), (5, 5), 0)
+    ]
+    
+    for img in images:
+        assert np.array_equal(_equalize(img), cv2.equalizeHist(img))
+
+
+def test_equalize_lut_single_valued():
+    """Test that single-valued images are left unchanged, as OpenCV does."""
+    for value in [0, 77, 255]:
+        img = np.full((16, 24), value, dtype=np.uint8)
+        assert np.array_equal(_equalize(img), cv2.equalizeHist(img))
+        assert np.array_equal(_equalize(img), img)
+
+
+@pytest.mark.skipif(not GPU_AVAILABLE, reason="requires cupy and a GPU")
+def test_gpu_batch_matches_cpu():
+    """Test that the GPU batch path matches preprocess_image exactly."""
+    rng = np.random.default_rng(1)
+    imgs = [rng.integers(0, 256, (96, 128)).astype(np.uint8) for _ in range(4)]
+    
+    for gpu, img in zip(preprocess_batch(imgs), imgs):
+        assert np.array_equal(gpu, preprocess_image(img))
+
+
+if __name__ == "__main__":
+    print("Running preprocessing tests...")
+    test_equalize_lut_matches_opencv()
+    print("✓ OpenCV equalization test passed")
+    
+    test_equalize_lut_single_valued()
+    print("✓ Single-valued image test passed")
+    
+    if GPU_AVAILABLE:
+        test_gpu_batch_matches_cpu()
+        print("✓ GPU batch test passed")
+    
+    print("\nAll tests passed!")
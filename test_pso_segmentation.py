@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Unit tests for PSO segmentation module.
+"""
+
+from contextlib import contextmanager
+import numpy as np
+import config
+from pso_segmentation import (
+    _fitness,
+    _cumulative_histograms,
+    _pso_run,
+    _otsu_threshold,
+    apply_threshold,
+    pso_threshold
+)
+
+
+@contextmanager
+def _config(**overrides):
+    """Temporarily override config values."""
+    saved = {name: getattr(config, name) for name in overrides}
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(config, name, value)
+
+
+def _broadcast_dice(img, gt_mask, thresholds):
+    """Reference Dice per threshold via one broadcast comparison."""
+    pred = img[None] > thresholds[:, None, None]
+    pred_flat = pred.reshape(len(thresholds), -1)
+    gt_flat = (gt_mask.reshape(-1) != 0).astype(np.int64)
+    
+    intersection = pred_flat @ gt_flat
+    denom = gt_flat.sum() + pred_flat.sum(axis=1)
+    return np.where(denom == 0, 1.0, 2 * intersection / np.maximum(denom, 1))
+
+
+def test_fitness_matches_broadcast_reference():
+    """Test histogram fitness against a broadcast full-image evaluation."""
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 256, (31, 47)).astype(np.uint8)
+    gt_mask = (rng.random((31, 47)) > 0.7).astype(np.uint8)
+    thresholds = np.concatenate([np.arange(256.0), rng.uniform(-10, 265, 50)])
+    
+    cum_all, cum_pos = _cumulative_histograms(img, gt_mask)
+    
+    assert np.allclose(_fitness(cum_all, cum_pos, thresholds), _broadcast_dice(img, gt_mask, thresholds))
+
+
+def test_exhaustive_is_optimal():
+    """Test that the default search returns the best Dice over all levels."""
+    rng = np.random.default_rng(1)
+    img = rng.integers(0, 256, (40, 40)).astype(np.uint8)
+    gt_mask = (img > 180).astype(np.uint8)
+    gt_mask[rng.random((40, 40)) > 0.9] ^= 1
+    
+    threshold = pso_threshold(img, gt_mask, method="exhaustive")
+    best = _broadcast_dice(img, gt_mask, np.arange(256.0)).max()
+    
+    pred = apply_threshold(img, threshold)
+    assert np.isclose(_broadcast_dice(img, gt_mask, np.array([threshold * 255]))[0], best)
+    assert pred.dtype == np.uint8
+
+
+def test_read_only_inputs():
+    """Test that read-only arrays (as cached by the API) are accepted."""
+    rng = np.random.default_rng(2)
+    img = rng.integers(0, 256, (32, 32)).astype(np.uint8)
+    gt_mask = (img > 150).astype(np.uint8)
+    expected = pso_threshold(img, gt_mask)
+    
+    img.flags.writeable = False
+    assert pso_threshold(img, gt_mask) == expected
+    
+    gt_mask.flags.writeable = False
+    assert pso_threshold(img, gt_mask) == expected
+
+
+def test_float_image_input():
+    """Test that float images on [0, 1] match their uint8 counterparts."""
+    rng = np.random.default_rng(3)
+    img = rng.integers(0, 256, (32, 32)).astype(np.uint8)
+    gt_mask = (img > 120).astype(np.uint8)
+    img_float = img / 255.0
+    
+    threshold = pso_threshold(img_float, gt_mask)
+    assert threshold == pso_threshold(img, gt_mask)
+    assert np.array_equal(apply_threshold(img_float, threshold), apply_threshold(img, threshold))
+    assert np.array_equal(apply_threshold(img_float.astype(np.float32), threshold), apply_threshold(img, threshold))
+
+
+def test_pso_early_exit():
+    """Test that the stall and spread checks stop the swarm before iters."""
+    rng = np.random.default_rng(4)
+    img = rng.integers(0, 256, (40, 40)).astype(np.uint8)
+    cum_all, cum_pos = _cumulative_histograms(img, (img > 200).astype(np.uint8))
+    
+    def run(max_stall, tol, min_spread):
+        return _pso_run(cum_all, cum_pos, 8, 200, 0.5, 1.5, 1.5, 0.0, 1.0, 0.0, 0.0, 0,
+                        max_stall, tol, min_spread)
+    
+    # Both checks disabled: every iteration runs
+    assert run(0, 0.0, 0.0)[2] == 200
+    # No gain can exceed tol = 1, so the swarm stalls out after max_stall
+    assert run(5, 1.0, 0.0)[2] == 5
+    # Any spread is below 1 on [0, 1], so the first iteration is the last
+    assert run(0, 0.0, 1.0)[2] == 1
+
+
+def test_otsu_gate():
+    """Test that a low OTSU_ACCEPT_DICE returns Otsu's threshold unchanged."""
+    rng = np.random.default_rng(5)
+    img = rng.integers(0, 256, (40, 40)).astype(np.uint8)
+    gt_mask = (img > 200).astype(np.uint8)
+    
+    with _config(OTSU_ACCEPT_DICE=0.0):
+        assert pso_threshold(img, gt_mask, method="pso") == _otsu_threshold(img)
+    
+    # Without the gate the swarm finds a different, better threshold
+    with _config(OTSU_ACCEPT_DICE=None):
+        assert pso_threshold(img, gt_mask, method="pso") != _otsu_threshold(img)
+
+
+def test_pso_reaches_optimum():
+    """Test that the swarm reaches the exhaustive optimum's Dice."""
+    rng = np.random.default_rng(1)
+    img = rng.integers(0, 256, (48, 48)).astype(np.uint8)
+    gt_mask = (img > 180).astype(np.uint8)
+    gt_mask[rng.random((48, 48)) > 0.9] ^= 1
+    
+    with _config(OTSU_ACCEPT_DICE=None):
+        threshold = pso_threshold(img, gt_mask, method="pso")
+    
+    best = _broadcast_dice(img, gt_mask, np.arange(256.0)).max()
+    assert np.isclose(_broadcast_dice(img, gt_mask, np.array([threshold * 255]))[0], best)
+
+
+def test_boundary_falls_back_to_otsu():
+    """Test that a swarm converging on a bound is replaced by Otsu's threshold."""
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 256, (48, 48)).astype(np.uint8)
+    # Only the brightest level is foreground, so the optimum sits above 0.99
+    gt_mask = (img == 255).astype(np.uint8)
+    
+    cum_all, cum_pos = _cumulative_histograms(img, gt_mask)
+    best_pos, _, _ = _pso_run(
+        cum_all, cum_pos, config.PSO_N_PARTICLES, config.PSO_ITERATIONS,
+        config.PSO_OPTIONS['w'], config.PSO_OPTIONS['c1'], config.PSO_OPTIONS['c2'],
+        config.PSO_BOUNDS[0], config.PSO_BOUNDS[1], 0.0, 0.0, config.RANDOM_SEED,
+        config.PSO_MAX_STALL, config.PSO_TOL, config.PSO_MIN_SPREAD
+    )
+    assert best_pos >= 0.99
+    
+    with _config(OTSU_ACCEPT_DICE=None, PSO_SEED_STD=None):
+        assert pso_threshold(img, gt_mask, method="pso") == _otsu_threshold(img)
+
+
+if __name__ == "__main__":
+    print("Running PSO segmentation tests...")
+    test_fitness_matches_broadcast_reference()
+    print("✓ Broadcast reference test passed")
+    
+    test_exhaustive_is_optimal()
+    print("✓ Exhaustive optimum test passed")
+    
+    test_read_only_inputs()
+    print("✓ Read-only input test passed")
+    
+    test_float_image_input()
+    print("✓ Float image input test passed")
+    
+    test_pso_early_exit()
+    print("✓ PSO early exit test passed")
+    
+    test_otsu_gate()
+    print("✓ Otsu gate test passed")
+    
+    test_pso_reaches_optimum()
+    print("✓ PSO optimum test passed")
+    
+    test_boundary_falls_back_to_otsu()
+    print("✓ Boundary fallback test passed")
+    
+    print("\nAll tests passed!")
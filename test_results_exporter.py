@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Unit tests for results exporter module.
+"""
+
+import csv
+import json
+import os
+import tempfile
+import numpy as np
+from results_exporter import export_results_to_csv, export_results_to_json
+
+
+def test_export_results_to_csv():
+    """Test CSV rows, number formatting and a missing threshold."""
+    metrics_list = [
+        ("case1", (0.9869186, 0.9741750358, 1.0, 0.9741750358), 0.95686274),
+        ("case2", (1.0, 1.0, 1.0, 1.0), None),
+        ("case3", (0.0, 0.0, 0.0, 0.0), 0.0)
+    ]
+    
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "metrics.csv")
+        export_results_to_csv(metrics_list, path)
+        with open(path, newline='') as f:
+            rows = list(csv.reader(f))
+    
+    assert rows == [
+        ['Image', 'Dice', 'IoU', 'Precision', 'Recall', 'Threshold'],
+        ['case1', '0.986919', '0.974175', '1.000000', '0.974175', '0.956863'],
+        ['case2', '1.000000', '1.000000', '1.000000', '1.000000', 'N/A'],
+        ['case3', '0.000000', '0.000000', '0.000000', '0.000000', '0.000000']
+    ]
+
+
+def test_export_results_to_csv_empty():
+    """Test that an empty metrics list writes only the header."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "metrics.csv")
+        export_results_to_csv([], path)
+        with open(path, newline='') as f:
+            rows = list(csv.reader(f))
+    
+    assert rows == [['Image', 'Dice', 'IoU', 'Precision', 'Recall', 'Threshold']]
+
+
+def test_export_results_to_json_numpy_values():
+    """Test JSON export of nested NumPy scalars and arrays."""
+    results = {
+        'count': np.int64(3),
+        'thresholds': np.array([0.25, 0.5]),
+        'tumour': {
+            'dice': {'mean': np.float32(0.5), 'max': np.float64(0.75)},
+            'flags': [np.bool_(True), np.int32(2)]
+        },
+        'name': 'run'
+    }
+    
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "summary.json")
+        export_results_to_json(results, path)
+        with open(path) as f:
+            exported = json.load(f)
+    
+    assert 'timestamp' in exported
+    del exported['timestamp']
+    assert exported == {
+        'count': 3,
+        'thresholds': [0.25, 0.5],
+        'tumour': {
+            'dice': {'mean': 0.5, 'max': 0.75},
+            'flags': [True, 2]
+        },
+        'name': 'run'
+    }
+    assert isinstance(exported['count'], int)
+
+
+if __name__ == "__main__":
+    print("Running results exporter tests...")
+    test_export_results_to_csv()
+    print("✓ CSV export test passed")
+    
+    test_export_results_to_csv_empty()
+    print("✓ Empty CSV export test passed")
+    
+    test_export_results_to_json_numpy_values()
+    print("✓ JSON NumPy export test passed")
+    
+    print("\nAll tests passed!")
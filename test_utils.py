@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Unit tests for utils module.
+"""
+
+import os
+import tempfile
+from utils import find_image_files, find_mask_path, get_mask_path, _list_directory
+
+
+def _touch(directory, name):
+    """Create an empty file and return its path."""
+    path = os.path.join(directory, name)
+    open(path, "w").close()
+    return path
+
+
+def test_find_image_files():
+    """Test single-scan discovery with case-insensitive extensions."""
+    with tempfile.TemporaryDirectory() as directory:
+        expected = [
+            _touch(directory, "a.png"),
+            _touch(directory, "b.JPG"),
+            _touch(directory, "c.jpeg")
+        ]
+        _touch(directory, "notes.txt")
+        os.mkdir(os.path.join(directory, "folder.png"))
+        
+        assert find_image_files(directory) == sorted(expected)
+        assert find_image_files(directory, ["png"]) == [expected[0]]
+
+
+def test_find_image_files_missing_directory():
+    """Test that a missing directory yields no images."""
+    with tempfile.TemporaryDirectory() as directory:
+        assert find_image_files(os.path.join(directory, "missing")) == []
+
+
+def test_find_mask_path():
+    """Test mask lookup against the cached directory index."""
+    with tempfile.TemporaryDirectory() as directory:
+        png_mask = _touch(directory, "case1_mask.png")
+        jpg_mask = _touch(directory, "case2_mask.JPG")
+        
+        assert find_mask_path("images/case1.jpg", directory) == png_mask
+        assert find_mask_path("images/case2.png", directory) == jpg_mask
+        assert find_mask_path("images/case3.png", directory) is None
+        assert get_mask_path("images/case3.png", directory) == os.path.join(directory, "case3_mask.jpg")
+        
+        # The index is built once per directory, so later files stay unseen
+        _touch(directory, "case3_mask.png")
+        assert find_mask_path("images/case3.png", directory) is None
+        _list_directory.cache_clear()
+        assert find_mask_path("images/case3.png", directory) is not None
+
+
+if __name__ == "__main__":
+    print("Running utils tests...")
+    test_find_image_files()
+    print("✓ Image discovery test passed")
+    
+    test_find_image_files_missing_directory()
+    print("✓ Missing directory test passed")
+    
+    test_find_mask_path()
+    print("✓ Mask lookup test passed")
+    
+    print("\nAll tests passed!")
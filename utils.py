@@ -4,13 +4,18 @@ Utility functions for file handling and path management.
 """
 
 import os
-import glob
+from functools import lru_cache
+from typing import FrozenSet, Optional
+
+MASK_EXTENSIONS = ["jpg", "png", "JPG", "PNG"]
 
 
 def find_image_files(directory, extensions=None):
     """
     Find all image files in a directory.
     
+    Uses a single directory scan and matches extensions case-insensitively.
+    
     Parameters
     ----------
     directory : str
@@ -24,16 +29,67 @@ def find_image_files(directory, extensions=None):
         Sorted list of image file paths
     """
     if extensions is None:
-        extensions = ["jpg", "jpeg", "png", "JPG", "PNG"]
+        extensions = ["jpg", "jpeg", "png"]
     
-    image_paths = []
-    for ext in extensions:
-        pattern = os.path.join(directory, f"*.{ext}")
-        image_paths.extend(glob.glob(pattern))
+    suffixes = {f".{ext.lower()}" for ext in extensions}
+    
+    try:
+        with os.scandir(directory) as entries:
+            image_paths = [
+                entry.path for entry in entries
+                if os.path.splitext(entry.name)[1].lower() in suffixes and entry.is_file()
+            ]
+    except FileNotFoundError:
+        return []
     
     return sorted(image_paths)
 
 
+@lru_cache(maxsize=None)
+def _list_directory(directory: str) -> FrozenSet[str]:
+    """
+    Names of the entries in a directory, scanned once per process.
+    
+    Lets mask lookups use set membership instead of one stat call per
+    candidate file. Files added to the directory after the first scan are
+    not seen.
+    """
+    try:
+        with os.scandir(directory) as entries:
+            return frozenset(entry.name for entry in entries)
+    except FileNotFoundError:
+        return frozenset()
+
+
+def find_mask_path(image_path, mask_dir, mask_suffix="_mask") -> Optional[str]:
+    """
+    Find the mask file for an image.
+    
+    Parameters
+    ----------
+    image_path : str
+        Path to image file
+    mask_dir : str
+        Directory containing masks
+    mask_suffix : str
+        Suffix to add before extension
+        
+    Returns
+    -------
+    str or None
+        Path to the mask file, or None if there is no mask for the image
+    """
+    base_name = os.path.splitext(os.path.basename(image_path))[0]
+    mask_names = _list_directory(mask_dir)
+    # Try common mask extensions
+    for ext in MASK_EXTENSIONS:
+        mask_name = f"{base_name}{mask_suffix}.{ext}"
+        if mask_name in mask_names:
+            return os.path.join(mask_dir, mask_name)
+    
+    return None
+
+
 def get_mask_path(image_path, mask_dir, mask_suffix="_mask"):
     """
     Generate mask path from image path.
@@ -52,12 +108,10 @@ def get_mask_path(image_path, mask_dir, mask_suffix="_mask"):
     str
         Path to corresponding mask file
     """
-    base_name = os.path.splitext(os.path.basename(image_path))[0]
-    # Try common mask extensions
-    for ext in ["jpg", "png", "JPG", "PNG"]:
-        mask_path = os.path.join(mask_dir, f"{base_name}{mask_suffix}.{ext}")
-        if os.path.exists(mask_path):
-            return mask_path
+    mask_path = find_mask_path(image_path, mask_dir, mask_suffix)
+    if mask_path is not None:
+        return mask_path
     
     # Return default path if not found
+    base_name = os.path.splitext(os.path.basename(image_path))[0]
     return os.path.join(mask_dir, f"{base_name}{mask_suffix}.jpg")
@@ -7,13 +7,38 @@ import matplotlib
 matplotlib.use("Agg")  # Headless-safe plotting
 import matplotlib.pyplot as plt
 import numpy as np
+import cv2
 import os
 
 
+def overlay_mask(img: np.ndarray, mask: np.ndarray, color: tuple, alpha: float = 0.6) -> np.ndarray:
+    """
+    Alpha-blend a solid color into a 3-channel image wherever mask is set.
+    
+    color follows the image's channel order, so this serves both the RGB
+    app panels and the BGR triplets written with OpenCV.
+    """
+    tint = np.empty_like(img)
+    tint[:] = color
+    blended = cv2.addWeighted(img, 1 - alpha, tint, alpha, 0)
+    return np.where(mask[..., None] > 0, blended, img)
+
+
+def _titled(panel: np.ndarray, title: str, height: int = 24) -> np.ndarray:
+    """Stack a white title strip on top of a BGR panel."""
+    strip = np.full((height, panel.shape[1], 3), 255, dtype=np.uint8)
+    cv2.putText(strip, title, (4, height - 7), cv2.FONT_HERSHEY_SIMPLEX,
+                0.5, (0, 0, 0), 1, cv2.LINE_AA)
+    return np.vstack([strip, panel])
+
+
 def save_triplet_comparison(img, gt_mask, pred_mask, output_path):
     """
     Save side-by-side comparison of input, ground truth, and prediction.
     
+    The three panels are composed as uint8 arrays and written with
+    cv2.imwrite at native resolution, with no Matplotlib figure per call.
+    
     Parameters
     ----------
     img : np.ndarray
@@ -25,28 +50,18 @@ def save_triplet_comparison(img, gt_mask, pred_mask, output_path):
     output_path : str
         Path to save the figure
     """
-    fig, axes = plt.subplots(1, 3, figsize=(9, 3))
-    
-    for ax in axes:
-        ax.axis("off")
-    
-    # Input image
-    axes[0].imshow(img, cmap="gray")
-    axes[0].set_title("Input")
+    if img.dtype != np.uint8:
+        img = cv2.normalize(img, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+    img_bgr = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
     
-    # Ground truth overlay
-    axes[1].imshow(img, cmap="gray")
-    axes[1].imshow(gt_mask, cmap="Reds", alpha=0.4)
-    axes[1].set_title("Ground Truth")
+    # Ground truth in red, prediction in blue (BGR order)
+    panels = [
+        _titled(img_bgr, "Input"),
+        _titled(overlay_mask(img_bgr, gt_mask, (0, 0, 255), alpha=0.4), "Ground Truth"),
+        _titled(overlay_mask(img_bgr, pred_mask, (255, 0, 0), alpha=0.4), "PSO Prediction")
+    ]
     
-    # Prediction overlay
-    axes[2].imshow(img, cmap="gray")
-    axes[2].imshow(pred_mask, cmap="Blues", alpha=0.4)
-    axes[2].set_title("PSO Prediction")
-    
-    plt.tight_layout()
-    plt.savefig(output_path, dpi=250, bbox_inches="tight")
-    plt.close()
+    cv2.imwrite(output_path, np.hstack(panels))
 
 
 def plot_dice_histogram(dice_scores, output_path):